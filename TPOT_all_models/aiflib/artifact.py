@@ -0,0 +1,167 @@
+import json
+import os
+import platform
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.pipeline import Pipeline
+
+from aiflib.logger import Logger
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+# Fitted attributes only needed to inspect the training, not to predict
+_TRAINING_ONLY_ATTRIBUTES = [
+    "oob_score_", "oob_decision_function_", "oob_prediction_",
+    "loss_curve_", "validation_scores_", "best_validation_score_",
+    "evals_result_", "train_score_", "oob_improvement_",
+]
+
+
+def flatten_pipeline(model):
+    """
+    (name, step) pairs of a possibly nested pipeline, in the order they are applied.
+    """
+    if not isinstance(model, Pipeline):
+        return [("estimator", model)]
+    steps = []
+    for name, step in model.steps:
+        if step is None or step == "passthrough":
+            continue
+        if isinstance(step, Pipeline):
+            steps += [(f"{name}.{inner_name}", inner) for inner_name, inner in flatten_pipeline(step)]
+        else:
+            steps.append((name, step))
+    return steps
+
+
+def strip_training_state(step):
+    # In place, the attributes are not used by the model after training either
+    for attribute in _TRAINING_ONLY_ATTRIBUTES:
+        if attribute in vars(step):
+            delattr(step, attribute)
+    return step
+
+
+def _versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "sklearn": sklearn.__version__}
+    try:
+        import tpot
+        versions["tpot"] = tpot.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def save_artifact(model, directory, feature_names=None, compress=3):
+    """
+    Save the inference state of a fitted pipeline to directory: one compressed joblib file
+    per step and a manifest with the library versions, feature names and classes.
+    The manifest is replaced last, so readers see either the previous or the new artifact.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous_files = set()
+    if os.path.isfile(os.path.join(directory, MANIFEST)):
+        with open(os.path.join(directory, MANIFEST)) as manifest_file:
+            previous_files = set(step["file"] for step in json.load(manifest_file)["steps"])
+
+    steps = []
+    for index, (name, step) in enumerate(flatten_pipeline(model)):
+        # Each step is written under the hash of its content, so the files of a
+        # previous artifact are never overwritten while it may still be loaded
+        step = strip_training_state(step)
+        filename = f"{index:02d}_{name}_{joblib.hash(step)[:12]}.joblib"
+        path = os.path.join(directory, filename)
+        if not os.path.isfile(path):
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(step, temporary_path, compress=compress)
+            os.replace(temporary_path, path)
+        steps.append({
+            "name": name,
+            "class": f"{type(step).__module__}.{type(step).__name__}",
+            "file": filename,
+            "bytes": os.path.getsize(path),
+        })
+
+    classes = getattr(model, "classes_", None)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "versions": _versions(),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "classes": np.asarray(classes).tolist() if classes is not None else None,
+        "steps": steps,
+    }
+    temporary_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(temporary_path, os.path.join(directory, MANIFEST))
+
+    # Remove older steps, keeping those of the replaced artifact for readers still loading it
+    current = set(step["file"] for step in steps) | previous_files
+    for filename in os.listdir(directory):
+        if filename.endswith(".joblib") and filename not in current:
+            os.remove(os.path.join(directory, filename))
+    return manifest
+
+
+class LazyPipeline:
+    """
+    Fitted pipeline saved by save_artifact. Steps are loaded from disk the first time
+    they are needed, so opening the artifact only reads its manifest.
+    """
+    def __init__(self, directory):
+        self.logger = Logger(__name__)
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format version [{self.manifest['format_version']}]")
+        versions = _versions()
+        for library, version in self.manifest["versions"].items():
+            if versions.get(library) not in (None, version):
+                self.logger.info(f"Artifact was saved with {library} [{version}], running with [{versions[library]}]")
+        self._steps = [None] * len(self.manifest["steps"])
+
+    @property
+    def classes_(self):
+        if self.manifest["classes"] is not None:
+            return np.asarray(self.manifest["classes"])
+        return self.step(len(self._steps) - 1).classes_
+
+    @property
+    def feature_names(self):
+        return self.manifest["feature_names"]
+
+    def step(self, index):
+        if self._steps[index] is None:
+            description = self.manifest["steps"][index]
+            self._steps[index] = joblib.load(os.path.join(self.directory, description["file"]))
+        return self._steps[index]
+
+    def _transform(self, X):
+        for index in range(len(self._steps) - 1):
+            X = self.step(index).transform(X)
+        return X
+
+    def transform(self, X):
+        return self.step(len(self._steps) - 1).transform(self._transform(X))
+
+    def predict(self, X):
+        return self.step(len(self._steps) - 1).predict(self._transform(X))
+
+    def predict_proba(self, X):
+        return self.step(len(self._steps) - 1).predict_proba(self._transform(X))
+
+    def score(self, X, y):
+        return self.step(len(self._steps) - 1).score(self._transform(X), y)
+
+    def to_pipeline(self):
+        """
+        Flat sklearn Pipeline with every step loaded, e.g. to refit it.
+        """
+        return Pipeline([
+            (description["name"].replace(".", "_"), self.step(index))
+            for index, description in enumerate(self.manifest["steps"])
+        ])
@@ -0,0 +1,257 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import weakref
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.model_selection import train_test_split
+
+if sklearn.__version__.startswith("0."):
+    # Histogram gradient boosting is experimental before scikit-learn 1.0
+    from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+from sklearn.ensemble import HistGradientBoostingClassifier as _HistGradientBoostingClassifier
+from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+
+from aiflib.config import Config
+from aiflib.logger import Logger
+
+# Bins of the pre-binned training matrix, HistGradientBoostingClassifier's default max_bins
+# plus the bin of missing values
+N_BINS = 256
+# Rows of a matrix compared to recognise it
+_FINGERPRINT_ROWS = 64
+
+_MAPPER_FILE = "bin_mapper.pkl"
+_CODES_FILE = "binned_training.npy"
+_FINGERPRINT_FILE = "binned_training.json"
+
+
+def _supports_prebinned():
+    """
+    Whether scikit-learn's HistGradientBoostingClassifier has the private hooks the operator
+    overrides (_bin_data(X, is_training_data), _random_seed), as in the versions it was
+    checked against, 0.22 to 1.2.
+    """
+    version = tuple(int(part) for part in re.findall(r"\d+", sklearn.__version__)[:2])
+    if not (0, 22) <= version < (1, 3):
+        return False
+    parameters = list(inspect.signature(_HistGradientBoostingClassifier._bin_data).parameters)
+    return parameters == ["self", "X", "is_training_data"]
+
+
+# Whether the operator can reuse pre-binned codes, otherwise it is the scikit-learn estimator
+PREBINNED = _supports_prebinned()
+
+
+def fingerprint(X):
+    """
+    Cheap identity of a dense matrix: its shape and a strided sample of its rows, whatever
+    its float dtype (the estimators convert float32 inputs to float64).
+    """
+    step = max(1, X.shape[0] // _FINGERPRINT_ROWS)
+    return joblib.hash((X.shape, np.ascontiguousarray(X[::step], dtype=np.float64)))
+
+
+def checksum(X, chunk_rows=65536):
+    """
+    Hash of all the values of a dense matrix as float64, computed chunk by chunk.
+    """
+    hasher = hashlib.md5(str(X.shape).encode("utf-8"))
+    for start in range(0, X.shape[0], chunk_rows):
+        hasher.update(np.ascontiguousarray(X[start:start + chunk_rows], dtype=np.float64).tobytes())
+    return hasher.hexdigest()
+
+
+def prebin(X, directory, random_state=None):
+    """
+    Fit the bins of the dense training matrix X once and write the bin mapper and the
+    uint8 codes of X to directory, for the HistGradientBoostingClassifier operator of the
+    search to reuse. Returns the path of the codes.
+
+    The bins are fitted on all the rows of X, the validation folds of the search included.
+    They are quantiles of the features, independent of the labels, so this is accepted as
+    an approximation of binning every fold; prebin=false bins the training rows of every
+    fold only.
+    """
+    mapper = _BinMapper(n_bins=N_BINS, random_state=random_state).fit(X)
+    codes = mapper.transform(X)
+    joblib.dump(mapper, os.path.join(directory, _MAPPER_FILE))
+    np.save(os.path.join(directory, _CODES_FILE), np.ascontiguousarray(codes))
+    with open(os.path.join(directory, _FINGERPRINT_FILE), "w") as fingerprint_file:
+        json.dump({"fingerprint": fingerprint(X), "checksum": checksum(X), "shape": list(X.shape)}, fingerprint_file)
+    Logger(__name__).info(f"Pre-binned the [{X.shape[0]}] x [{X.shape[1]}] training matrix into [{N_BINS}] bins")
+    return os.path.join(directory, _CODES_FILE)
+
+
+def remove_prebinned(directory):
+    for name in [_MAPPER_FILE, _CODES_FILE, _FINGERPRINT_FILE]:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+class _BinnedMatrices:
+    """
+    Codes of the matrices of this process in the pre-fitted bins: the pre-binned training
+    matrix, memory mapped, and the matrices the search runs on (e.g. subsamples), binned
+    once on first use. Loaded from artifacts_directory, so evaluation workers share it.
+    Matrices are looked up by fingerprint and their codes only used if all their values
+    match (checksum), which is computed once per matrix object.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_from = None
+        self._checksums = {}
+        self.mapper = None
+        self.training_key = None
+        self.codes = {}
+
+    def load(self):
+        directory = Config().artifacts_directory
+        fingerprint_path = os.path.join(directory, _FINGERPRINT_FILE)
+        if not os.path.isfile(fingerprint_path):
+            self.mapper, self.training_key, self.codes, self._loaded_from = None, None, {}, None
+            return None
+        key = (directory, os.path.getmtime(fingerprint_path))
+        if key != self._loaded_from:
+            with open(fingerprint_path) as fingerprint_file:
+                training = json.load(fingerprint_file)
+            self.mapper = joblib.load(os.path.join(directory, _MAPPER_FILE))
+            self.training_key = training["fingerprint"]
+            self.codes = {self.training_key: (
+                training["checksum"], np.load(os.path.join(directory, _CODES_FILE), mmap_mode="r"))}
+            self._loaded_from = key
+        return self.mapper
+
+    def checksum(self, X):
+        entry = self._checksums.get(id(X))
+        if entry is not None and entry[0]() is X:
+            return entry[1]
+        value = checksum(X)
+        self._checksums = {identity: entry for identity, entry in self._checksums.items() if entry[0]() is not None}
+        self._checksums[id(X)] = (weakref.ref(X), value)
+        return value
+
+    def lookup(self, X):
+        """
+        Fingerprint of X and its cached codes, None if they are not cached.
+        """
+        key = fingerprint(X)
+        entry = self.codes.get(key)
+        if entry is not None and entry[0] == self.checksum(X):
+            return key, entry[1]
+        return key, None
+
+    def training(self, X):
+        """
+        Codes of X if it is the pre-binned training matrix, else None.
+        """
+        with self._lock:
+            if self.load() is None:
+                return None
+            key, codes = self.lookup(X)
+            return codes if key == self.training_key else None
+
+    def of(self, X):
+        """
+        Codes of all the rows of X, which has the columns of the training matrix, None
+        without pre-fitted bins.
+        """
+        with self._lock:
+            if self.load() is None:
+                return None
+            key, codes = self.lookup(X)
+            if codes is None:
+                # Keep the training matrix and the latest other matrix
+                for other in [other for other in self.codes if other != self.training_key]:
+                    del self.codes[other]
+                codes = self.mapper.transform(X)
+                self.codes[key] = (self.checksum(X), codes)
+            return codes
+
+
+_binned = _BinnedMatrices()
+# Matrix and rows of the cross-validation fold being fitted in this thread
+_fold = threading.local()
+
+
+@contextmanager
+def fold(features, rows):
+    """
+    Mark the estimators fitted in the block as fitted on features[rows], so that the
+    HistGradientBoostingClassifier operator takes their codes from the pre-binned matrix.
+    """
+    _fold.features, _fold.rows = features, rows
+    try:
+        yield
+    finally:
+        _fold.features, _fold.rows = None, None
+
+
+def _same_rows(X, features, rows):
+    if X.shape != (len(rows),) + features.shape[1:] or len(rows) == 0:
+        return False
+    probes = np.unique([0, len(rows) // 2, len(rows) - 1])
+    return np.array_equal(np.asarray(X[probes]), np.asarray(features[rows[probes]], dtype=X.dtype))
+
+
+class HistGradientBoostingClassifier(_HistGradientBoostingClassifier):
+    """
+    scikit-learn's HistGradientBoostingClassifier which reuses the bins fitted once on the
+    training matrix (see prebin) instead of binning the data of every fit, as long as it
+    is fitted on rows of the matrix the search runs on (i.e. not behind a transformer) with
+    the default max_bins. Otherwise, once fitted, and with scikit-learn versions without
+    the hooks it overrides (see PREBINNED), it is the scikit-learn estimator.
+    """
+    def _prebinned_codes(self, X, is_training_data):
+        if not PREBINNED or self.max_bins + 1 != N_BINS:
+            return None
+        features, rows = getattr(_fold, "features", None), getattr(_fold, "rows", None)
+        if features is None:
+            # Fitted outside of a fold, e.g. refitted on the whole training matrix
+            return _binned.training(X)
+        if X.shape[0] != len(rows):
+            # Early stopping held out part of the rows, split like fit does
+            split = train_test_split(
+                rows, test_size=self.validation_fraction, random_state=self._random_seed,
+                stratify=getattr(self, "_fold_y", None))
+            rows = split[0] if is_training_data else split[1]
+        if not _same_rows(X, features, rows):
+            return None
+        codes = _binned.of(features)
+        return None if codes is None else codes[rows]
+
+    def fit(self, X, y, sample_weight=None):
+        # The labels of the rows, to reproduce the stratified early stopping split; it is
+        # not stratified with sample weights
+        self._fold_y = np.asarray(y) if sample_weight is None else None
+        try:
+            if sample_weight is None:
+                # scikit-learn < 0.23 has no sample_weight
+                return super(HistGradientBoostingClassifier, self).fit(X, y)
+            return super(HistGradientBoostingClassifier, self).fit(X, y, sample_weight)
+        finally:
+            del self._fold_y
+
+    def _bin_data(self, X, is_training_data):
+        try:
+            codes = self._prebinned_codes(X, is_training_data)
+        except Exception:
+            codes = None
+        if codes is None:
+            return super(HistGradientBoostingClassifier, self)._bin_data(X, is_training_data)
+
+        # The mapper fit created, named bin_mapper_ before scikit-learn 1.0
+        name = "_bin_mapper" if hasattr(self, "_bin_mapper") else "bin_mapper_"
+        if is_training_data:
+            mapper = getattr(self, name)
+            mapper.__dict__.update({key: value for key, value in _binned.mapper.__dict__.items()
+                                    if key.endswith("_")})
+            return np.asfortranarray(codes)
+        return np.ascontiguousarray(codes)
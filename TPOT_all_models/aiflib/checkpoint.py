@@ -0,0 +1,131 @@
+import os
+import time
+
+import joblib
+
+from aiflib.logger import Logger
+
+
+def atomic_dump(value, path, **kwargs):
+    """
+    joblib.dump to a temporary file next to path and move it in place, so readers never
+    see a partially written file.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(value, temporary_path, **kwargs)
+    os.replace(temporary_path, path)
+
+
+class SearchCheckpoint:
+    """
+    Generation callback which periodically persists the state of the search (population,
+    evaluated pipelines and best pipeline so far), so that a preempted search can resume.
+    on_new_best(optimizer) is called at every checkpoint at which the best pipeline changed.
+    data_hash identifies the data the search runs on, training_hash the training data of
+    the model before any preprocessing (see Model.train).
+    """
+    def __init__(self, path, interval_mins, data_hash, resumed_state=None, on_new_best=None, training_hash=None):
+        self.logger = Logger(__name__)
+        self.path = path
+        self.interval_mins = interval_mins
+        self.data_hash = data_hash
+        self.training_hash = training_hash
+        self.on_new_best = on_new_best
+        self.start_time = time.time()
+        self.last_write = self.start_time
+        self.previous_elapsed_mins = resumed_state["elapsed_mins"] if resumed_state else 0.
+        self.best_pipeline = resumed_state["best_pipeline"] if resumed_state else None
+
+    @property
+    def elapsed_mins(self):
+        return self.previous_elapsed_mins + (time.time() - self.start_time) / 60.
+
+    def __call__(self, optimizer, gen):
+        if time.time() - self.last_write < self.interval_mins * 60:
+            return
+        self.save(optimizer, gen)
+        self.last_write = time.time()
+
+    def save(self, optimizer, gen):
+        best_pipeline = str(optimizer._optimized_pipeline) if optimizer._optimized_pipeline else None
+        population = [str(individual) for individual in optimizer._pop]
+        if optimizer._pareto_front:
+            population += [str(individual) for individual in optimizer._pareto_front.items]
+
+        state = {
+            "data_hash": self.data_hash,
+            "training_hash": self.training_hash,
+            "generation": gen,
+            "elapsed_mins": self.elapsed_mins,
+            "population": list(dict.fromkeys(population)),
+            "evaluated_individuals": optimizer.evaluated_individuals_,
+            "best_pipeline": best_pipeline,
+            "best_score": optimizer._optimized_pipeline_score,
+        }
+        atomic_dump(state, self.path)
+        self.logger.info(f"Saved search checkpoint at generation [{gen}] with [{len(state['evaluated_individuals'])}] "
+                         f"evaluated pipelines to {self.path}")
+
+        if best_pipeline is not None and best_pipeline != self.best_pipeline and self.on_new_best is not None:
+            self.on_new_best(optimizer)
+        self.best_pipeline = best_pipeline
+
+    @staticmethod
+    def load(path, data_hash):
+        """
+        Search state saved for the same training data, None if there is nothing to resume.
+        """
+        if not os.path.isfile(path):
+            return None
+        logger = Logger(__name__)
+        try:
+            state = joblib.load(path)
+        except Exception as e:
+            logger.info(f"Ignoring unreadable search checkpoint {path}: {e}")
+            return None
+        if state.get("data_hash") != data_hash:
+            logger.info(f"Ignoring search checkpoint {path} saved for different training data.")
+            return None
+        logger.info(f"Resuming search from generation [{state['generation']}] after [{state['elapsed_mins']:.1f}] minutes "
+                    f"with [{len(state['evaluated_individuals'])}] evaluated pipelines.")
+        return state
+
+    @staticmethod
+    def remove_stale(path, training_hash):
+        """
+        Whether a checkpoint of a search on the training data of training_hash is left
+        over; any other checkpoint at path is removed.
+        """
+        if not os.path.isfile(path):
+            return False
+        try:
+            state = joblib.load(path)
+        except Exception:
+            state = {}
+        if state.get("training_hash") == training_hash:
+            return True
+        Logger(__name__).info(f"Removing search checkpoint {path}, unreadable or of other training data.")
+        os.remove(path)
+        return False
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class BestPipelineSnapshot:
+    """
+    Generation callback which calls on_new_best(optimizer) every time the search finds a
+    pipeline with a better internal CV score, e.g. to publish an improving model while a
+    long search is still running.
+    """
+    def __init__(self, on_new_best):
+        self.on_new_best = on_new_best
+        self.best_score = None
+
+    def __call__(self, optimizer, gen):
+        score = optimizer._optimized_pipeline_score
+        if score is None or (self.best_score is not None and score <= self.best_score):
+            return
+        self.best_score = score
+        self.on_new_best(optimizer)
@@ -0,0 +1,281 @@
+import pickle
+import time
+
+import numpy as np
+from sklearn.pipeline import FeatureUnion, Pipeline
+from sklearn.tree._tree import Tree
+
+from aiflib.artifact import flatten_pipeline, strip_training_state
+from aiflib.logger import Logger
+
+# XGBoost boosters are serialized by xgboost in its own format and are left as they are.
+
+# Node fields which are only used to compute feature importances, not to predict
+_TRAINING_ONLY_NODE_FIELDS = ["impurity", "n_node_samples", "weighted_n_node_samples"]
+
+
+def _narrow_int(values):
+    for dtype in [np.int8, np.int16, np.int32]:
+        if values.min() >= np.iinfo(dtype).min and values.max() <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values
+
+
+def _float32_below(values):
+    """
+    float32 thresholds which split float32 inputs exactly like the float64 ones: the
+    largest float32 not greater than each threshold.
+    """
+    narrowed = values.astype(np.float32)
+    above = narrowed.astype(np.float64) > values
+    narrowed[above] = np.nextafter(narrowed[above], np.float32(-np.inf))
+    return narrowed
+
+
+def _restore_tree(arguments, state):
+    tree = CompactTree(*arguments)
+    nodes = np.zeros(state["node_count"], dtype=state["dtype"])
+    for field, values in state["fields"].items():
+        nodes[field] = values
+    leaves = state["fields"]["left_child"] == -1
+    values = np.zeros((state["node_count"],) + state["value_shape"], dtype=np.float64)
+    values[leaves] = state["leaf_values"]
+    tree.__setstate__({
+        "max_depth": state["max_depth"],
+        "node_count": state["node_count"],
+        "nodes": nodes,
+        "values": values,
+    })
+    return tree
+
+
+class CompactTree(Tree):
+    """
+    sklearn Tree which is pickled with the smallest integer types for its node arrays,
+    float32 thresholds and leaf values, and without the training statistics of its nodes.
+    Unpickling restores a CompactTree which predicts like the original tree (up to the
+    float32 rounding of the leaf values); its feature importances are no longer available.
+    """
+    def __reduce__(self):
+        arguments, state = super(CompactTree, self).__reduce__()[1:]
+        nodes = state["nodes"]
+        leaves = nodes["left_child"] == -1
+        fields = {}
+        for field in nodes.dtype.names:
+            if field in _TRAINING_ONLY_NODE_FIELDS:
+                continue
+            elif field == "threshold":
+                fields[field] = _float32_below(nodes[field])
+            elif np.issubdtype(nodes.dtype[field], np.signedinteger):
+                fields[field] = _narrow_int(nodes[field])
+            else:
+                fields[field] = nodes[field].copy()
+        return (_restore_tree, (arguments, {
+            "max_depth": state["max_depth"],
+            "node_count": state["node_count"],
+            "dtype": nodes.dtype,
+            "fields": fields,
+            "value_shape": state["values"].shape[1:],
+            "leaf_values": state["values"][leaves].astype(np.float32),
+        }))
+
+    @classmethod
+    def from_tree(cls, tree):
+        arguments, state = tree.__reduce__()[1:]
+        compact = cls(*arguments)
+        compact.__setstate__(state)
+        return compact
+
+
+def _wrapped(estimator):
+    """
+    Fitted estimators an estimator applies: the steps of a pipeline, the transformers of a
+    feature union or the estimator of a wrapper such as TPOT's StackingEstimator.
+    """
+    if isinstance(estimator, Pipeline):
+        inner = [step for _, step in estimator.steps]
+    elif isinstance(estimator, FeatureUnion):
+        inner = [transformer for _, transformer in estimator.transformer_list]
+    elif hasattr(estimator, "get_support"):
+        # Selectors such as SelectFromModel compute the feature importances of their
+        # estimator when transforming, which compact or pruned trees would change
+        inner = []
+    else:
+        inner = [getattr(estimator, "estimator", None)]
+    return [step for step in inner
+            if step is not None and not isinstance(step, (str, type)) and hasattr(step, "get_params")]
+
+
+def _tree_holders(estimator):
+    """
+    Fitted decision trees (objects with a tree_) of an estimator and of the estimators it wraps.
+    """
+    holders = []
+    if isinstance(getattr(estimator, "tree_", None), Tree):
+        holders.append(estimator)
+    estimators = getattr(estimator, "estimators_", None)
+    if estimators is not None:
+        for inner in np.asarray(estimators, dtype=object).ravel():
+            holders += _tree_holders(inner)
+    for inner in _wrapped(estimator):
+        holders += _tree_holders(inner)
+    return holders
+
+
+def _strip_nested(estimator):
+    strip_training_state(estimator)
+    for inner in _wrapped(estimator):
+        _strip_nested(inner)
+
+
+def compact_trees(model):
+    """
+    Replace the trees of every tree ensemble in the pipeline, also inside feature unions
+    and stacked estimators, by CompactTrees and drop training-only attributes, in place.
+    Returns the number of trees replaced.
+    """
+    count = 0
+    for _, step in flatten_pipeline(model):
+        _strip_nested(step)
+        for holder in _tree_holders(step):
+            if not isinstance(holder.tree_, CompactTree):
+                holder.tree_ = CompactTree.from_tree(holder.tree_)
+                count += 1
+    return count
+
+
+def _accuracy(classes, probabilities, y):
+    return np.mean(classes[np.argmax(probabilities, axis=1)] == y)
+
+
+def _log_loss(classes, probabilities, y):
+    probabilities = probabilities / probabilities.sum(axis=1, keepdims=True)
+    observed = probabilities[np.arange(len(y)), np.searchsorted(classes, y)]
+    return float(-np.mean(np.log(np.clip(observed, 1e-15, 1.))))
+
+
+def _within(classes, probabilities, y, baseline, max_loss, max_log_loss):
+    return (_accuracy(classes, probabilities, y) >= baseline[0] - max_loss
+            and _log_loss(classes, probabilities, y) <= baseline[1] + max_log_loss)
+
+
+def prune_forest(forest, X, y, max_loss, max_log_loss, min_estimators):
+    """
+    Keep the fewest first trees of a random forest / extra trees classifier, and at least
+    min_estimators, whose validation accuracy and log loss are within max_loss and
+    max_log_loss of those of all the trees. The trees are interchangeable, choosing which
+    ones to keep by their validation scores would fit the validation rows.
+    """
+    if getattr(forest, "n_outputs_", 1) != 1:
+        return 0
+    totals = np.cumsum([tree.predict_proba(X) for tree in forest.estimators_], axis=0)
+    baseline = (_accuracy(forest.classes_, totals[-1], y), _log_loss(forest.classes_, totals[-1], y))
+    first = max(1, min(min_estimators, len(totals)))
+    kept = first + next(index for index, total in enumerate(totals[first - 1:])
+                        if _within(forest.classes_, total, y, baseline, max_loss, max_log_loss))
+
+    pruned = len(forest.estimators_) - kept
+    forest.estimators_ = forest.estimators_[:kept]
+    forest.n_estimators = kept
+    return pruned
+
+
+def prune_boosting(booster, X, y, max_loss, max_log_loss, min_estimators):
+    """
+    Truncate a gradient boosting classifier to the fewest stages, and at least
+    min_estimators, whose validation accuracy and log loss are within max_loss and
+    max_log_loss of those of all stages.
+    """
+    staged = list(booster.staged_predict_proba(X))
+    baseline = (_accuracy(booster.classes_, staged[-1], y), _log_loss(booster.classes_, staged[-1], y))
+    first = max(1, min(min_estimators, len(staged)))
+    stages = first + next(index for index, probabilities in enumerate(staged[first - 1:])
+                          if _within(booster.classes_, probabilities, y, baseline, max_loss, max_log_loss))
+    pruned = (len(booster.estimators_) - stages) * booster.estimators_.shape[1]
+    booster.estimators_ = booster.estimators_[:stages]
+    booster.n_estimators = booster.n_estimators_ = stages
+    if hasattr(booster, "train_score_"):
+        booster.train_score_ = booster.train_score_[:stages]
+    return pruned
+
+
+_PRUNERS = {"ExtraTreesClassifier": prune_forest, "RandomForestClassifier": prune_forest,
+            "GradientBoostingClassifier": prune_boosting}
+
+
+def _prune_nested(estimator, X, y, max_loss, max_log_loss, min_estimators, pruned):
+    """
+    Prune the tree ensembles of a fitted estimator and of the estimators it wraps, each on
+    the validation rows as they reach it, appending (ensemble name, pruned trees) to pruned.
+    Steps of a pipeline are pruned before they transform the rows for the next ones.
+    """
+    if isinstance(estimator, Pipeline):
+        steps = _wrapped(estimator)
+        for step in steps[:-1]:
+            _prune_nested(step, X, y, max_loss, max_log_loss, min_estimators, pruned)
+            X = step.transform(X)
+        _prune_nested(steps[-1], X, y, max_loss, max_log_loss, min_estimators, pruned)
+        return
+    for inner in _wrapped(estimator):
+        _prune_nested(inner, X, y, max_loss, max_log_loss, min_estimators, pruned)
+    prune = _PRUNERS.get(type(estimator).__name__)
+    if prune is not None and hasattr(estimator, "estimators_"):
+        pruned.append((type(estimator).__name__, prune(estimator, X, y, max_loss, max_log_loss, min_estimators)))
+
+
+def _validation_metrics(model, X, y):
+    probabilities = model.predict_proba(X)
+    return {"accuracy": float(_accuracy(model.classes_, probabilities, y)),
+            "log_loss": _log_loss(model.classes_, probabilities, y)}
+
+
+def model_size_mb(model):
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 2. ** 20
+
+
+def _latency_ms(model, X, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        model.predict(X)
+        times.append(time.time() - start)
+    return 1000. * min(times)
+
+
+def compact_model(model, X, y=None, max_loss=None, max_log_loss=0.01, min_estimators=20):
+    """
+    Compact the tree ensembles of a fitted pipeline in place: narrow the serialized node
+    arrays and, if max_loss is set and validation labels y are given, prune every ensemble,
+    also those inside feature unions and stacked estimators, within max_loss of its
+    validation accuracy and max_log_loss of its validation log loss. X, y must not be the
+    data the model is evaluated on. Returns a report of the size and latency of predicting
+    X before and after, and of the validation metrics of the model.
+    """
+    logger = Logger(__name__)
+    report = {"size_mb_before": model_size_mb(model), "latency_ms_before": _latency_ms(model, X)}
+
+    report["pruned_trees"] = 0
+    if max_loss is not None and y is not None:
+        scored = hasattr(model, "predict_proba")
+        if scored:
+            report["validation_before"] = _validation_metrics(model, X, y)
+        pruned = []
+        _prune_nested(model, X, y, max_loss, max_log_loss, min_estimators, pruned)
+        report["pruned_trees"] = sum(trees for _, trees in pruned)
+        for name, trees in pruned:
+            if trees:
+                logger.info(f"Pruned [{trees}] trees of [{name}] on [{len(y)}] validation rows")
+        if scored:
+            report["validation_after"] = _validation_metrics(model, X, y)
+            logger.info(f"Validation accuracy [{report['validation_before']['accuracy']:.4f}] -> "
+                        f"[{report['validation_after']['accuracy']:.4f}], log loss "
+                        f"[{report['validation_before']['log_loss']:.4f}] -> [{report['validation_after']['log_loss']:.4f}]")
+
+    report["compacted_trees"] = compact_trees(model)
+    report["size_mb_after"] = model_size_mb(model)
+    report["latency_ms_after"] = _latency_ms(model, X)
+    logger.info(f"Compacted [{report['compacted_trees']}] trees and pruned [{report['pruned_trees']}]: "
+                f"size [{report['size_mb_before']:.1f}] -> [{report['size_mb_after']:.1f}] MB, "
+                f"predict latency [{report['latency_ms_before']:.1f}] -> [{report['latency_ms_after']:.1f}] ms "
+                f"for [{len(X)}] rows")
+    return report
@@ -33,6 +33,16 @@ def is_folder_empty(path):
     else:
         return False
 
+# Metrics which do not depend on the class priors, the only ones a balanced search subsample
+# can be scored with
+BALANCED_METRICS = ["balanced_accuracy", "recall_macro", "f1_macro", "roc_auc", "roc_auc_ovo"]
+
+def comma_separated(value):
+    """
+    Stripped, non empty names of a comma separated list.
+    """
+    return [name.strip() for name in value.split(",") if name.strip()]
+
 def os_int(name, default, condition, message):
     if name in os.environ:
         try:
@@ -85,13 +95,29 @@ class Config:
     Configuration driven by environment variables.
     """
     _exposed_variables = set([
-        "target_column", "csv_name", "encoding", "encoding", "scoring", "max_time_mins", "warm_start",
+        "package_directory", "operators", "target_column", "csv_name", "id_encoding", "id_columns", "id_min_unique", "id_hash_buckets",
+        "sparse", "categorical_columns", "encoding", "encoding", "scoring", "max_time_mins", "engines", "engine_schedule",
+        "engine_holdout", "xgboost_early_stopping_rounds", "prebin", "warm_start",
         "generations", "population_size", "offspring_size", "mutation_rate", "crossover_rate",
-        "cv", "subsample", "max_eval_time_mins", "early_stop", "random_seed", "percentage_evaluate",
+        "cv", "subsample", "subsample_strategy", "subsample_refit", "max_eval_time_mins", "early_stop", "early_stop_delta", "early_stop_mins",
+        "random_seed", "percentage_evaluate", "checkpoint_interval_mins", "resume",
+        "snapshot_best", "snapshot_subsample", "incremental", "compact_model", "prune_max_loss",
+        "prune_max_log_loss", "prune_min_estimators", "prune_validation",
+        "selection", "latency_budget_ms", "size_budget_mb", "selection_candidates", "selection_tolerance",
+        "gate", "gate_max_latency_ms", "gate_min_throughput", "gate_max_size_mb", "gate_max_regression",
+        "gate_sample_rows", "gate_request_rows", "autosklearn_resampling", "autosklearn_ensemble_size",
+        "autosklearn_ensemble_nbest", "autosklearn_slim", "autosklearn_ensemble_min_weight", "artifact_format", "hot_reload",
+        "serving_metrics_interval_secs",
+        "telemetry", "profiling", "profiling_format", "profile_capture", "n_jobs", "threads_per_job", "memory_per_eval_mb", "max_eval_memory_mb", "dask_scheduler", "dask_workers",
     ])
 
     def __init__(self):
-        self.cur_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+        # Directory of the ML package (model/, artifacts/, ...), by default the one containing
+        # aiflib; variants sharing this aiflib set it to their own directory
+        self.cur_dir = os.path.abspath(os_param(
+            "package_directory", os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            lambda x: os.path.isdir(x), "package_directory should be an existing directory"
+        ))
         join_path = partial(os.path.join, self.cur_dir)
         unconditional = lambda x: True
 
@@ -113,6 +139,37 @@ class Config:
         self.encoding = os_param(
             "encoding", "utf-8", unconditional, ""
         )
+        # Encoding of identifier columns before the search, see aiflib.encoding
+        self.id_encoding = os_param(
+            "id_encoding", "frequency", lambda x: x in ["frequency", "hash", "none"],
+            "id_encoding must be one of [frequency, hash, none]"
+        )
+        # Comma separated identifier columns, by default they are detected
+        self.id_columns = os_param(
+            "id_columns", None, unconditional, ""
+        )
+        # Minimum number of distinct values of a detected identifier column
+        self.id_min_unique = os_int(
+            "id_min_unique", 1000, lambda x: x > 1,
+            "id_min_unique must be greater than 1"
+        )
+        self.id_hash_buckets = os_int(
+            "id_hash_buckets", 65536, lambda x: x > 1 and x & (x - 1) == 0,
+            "id_hash_buckets must be a power of 2"
+        )
+        # One-hot encode categorical columns to a sparse matrix and search sparse-capable operators
+        self.sparse = os_flag(
+            "sparse", "false"
+        )
+        # Comma separated categorical columns, non-numeric columns are always categorical
+        self.categorical_columns = os_param(
+            "categorical_columns", None, unconditional, ""
+        )
+        # Bin the training matrix once for the HistGradientBoostingClassifier operator
+        # instead of in every fit of the search
+        self.prebin = os_flag(
+            "prebin", "true"
+        )
         #####################################
         #       Basic model parameters      #
         #####################################
@@ -128,10 +185,39 @@ class Config:
             "scoring", "accuracy", lambda x: x in permissible_metrics,
             f"evaluation metric to be returned must be one of [{permissible_metrics}]"
         )
+        # Operators TPOT searches: "all" of classifier_config_dict, or "xgboost" for XGBClassifier
+        # with the preprocessors and selectors of classifier_config_dict
+        self.operators = os_param(
+            "operators", "all", lambda x: x in ["all", "xgboost"],
+            "operators must be one of [all, xgboost]"
+        )
         self.max_time_mins = os_int(
             "max_time_mins", 2, lambda x: x > 0,
             f"maximum training time must be greater than 0"
         )
+        # Comma separated search engines sharing max_time_mins, the best one on a hold-out of the
+        # training rows is deployed (see aiflib.engines)
+        self.engines = os_param(
+            "engines", "tpot",
+            lambda x: len(comma_separated(x)) > 0 and set(comma_separated(x)) <= set(["tpot", "autosklearn", "xgboost"]),
+            "engines must be a comma separated list of [tpot, autosklearn, xgboost]"
+        )
+        # "concurrent" runs the engines at once on a share of the cores each, "sequential" one
+        # after the other on all cores for a share of max_time_mins each
+        self.engine_schedule = os_param(
+            "engine_schedule", "concurrent", lambda x: x in ["concurrent", "sequential"],
+            "engine_schedule must be one of [concurrent, sequential]"
+        )
+        # Fraction of the training rows held out to compare the engines
+        self.engine_holdout = os_float(
+            "engine_holdout", 0.2, lambda x: x > 0 and x < 1,
+            "engine_holdout must be in the range (0.0, 1.0)"
+        )
+        # Rounds without improvement on the held out fold after which the xgboost engine stops a candidate
+        self.xgboost_early_stopping_rounds = os_int(
+            "xgboost_early_stopping_rounds", 10, lambda x: x > 0,
+            "xgboost_early_stopping_rounds must be greater than 0"
+        )
         self.warm_start = os_flag(
             "warm_start","false"
         )
@@ -173,6 +259,18 @@ class Config:
             "subsample", 1, lambda x: x >= 0 and x < 1.0,
             "fraction of training samples that are used during the TPOT optimization process must be in the range (0.0, 1.0]"
         )
+        # How the subsample is drawn: uniform (TPOT's own), stratified or balanced between classes.
+        # Balanced changes the class priors the candidates are scored under, the deployed pipeline
+        # is refitted under those of the training data, so it requires a metric of BALANCED_METRICS
+        self.subsample_strategy = os_param(
+            "subsample_strategy", "uniform",
+            lambda x: x in ["uniform", "stratified"] or (x == "balanced" and self.scoring in BALANCED_METRICS),
+            f"subsample_strategy must be one of [uniform, stratified, balanced], balanced requires scoring to be one of {BALANCED_METRICS}"
+        )
+        # Refit the best pipeline on all the training data after a search on a subsample
+        self.subsample_refit = os_flag(
+            "subsample_refit", "false"
+        )
         self.max_eval_time_mins = os_int(
             "max_eval_time_mins", 5, lambda x: x > 0,
             "max_eval_time_mins must be greater than 0"
@@ -181,8 +279,154 @@ class Config:
             "early_stop", None, lambda x: x > 0,
             "early_stop must be greater than 0"
         )
+        # Improvement of the best CV score below which a generation counts towards early_stop
+        self.early_stop_delta = os_float(
+            "early_stop_delta", 0.0, lambda x: x >= 0,
+            "early_stop_delta must be greater than or equal to 0"
+        )
+        # Stop once the best CV score has not improved for this many minutes
+        self.early_stop_mins = os_int(
+            "early_stop_mins", None, lambda x: x > 0,
+            "early_stop_mins must be greater than 0"
+        )
         self.seed = os_int(
             "random_seed", 0, unconditional, "")
+        # Save the search state every so many minutes, 0 disables checkpointing
+        self.checkpoint_interval_mins = os_int(
+            "checkpoint_interval_mins", 5, lambda x: x >= 0,
+            "checkpoint_interval_mins must be greater than or equal to 0"
+        )
+        # Resume an interrupted search from its checkpoint
+        self.resume = os_flag(
+            "resume", "true"
+        )
+        # Save every new best pipeline as Model.sav while the search is running
+        self.snapshot_best = os_flag(
+            "snapshot_best", "false"
+        )
+        # Fraction of the training rows the snapshots are fitted on
+        self.snapshot_subsample = os_float(
+            "snapshot_subsample", 1.0, lambda x: x > 0 and x <= 1.0,
+            "snapshot_subsample must be in the range (0.0, 1.0]"
+        )
+
+        # Retrain an existing model on the new training files only, where its final estimator allows it
+        self.incremental = os_flag(
+            "incremental", "false"
+        )
+
+        # Narrow the node arrays of tree ensembles in the saved model after training
+        self.compact_model = os_flag(
+            "compact_model", "false"
+        )
+        # Prune the trees of the final ensemble within this loss of validation accuracy, requires compact_model
+        self.prune_max_loss = os_float(
+            "prune_max_loss", None, lambda x: x >= 0 and x < 1,
+            "prune_max_loss must be in the range [0.0, 1.0)"
+        )
+        # Increase of the validation log loss the pruning may cause
+        self.prune_max_log_loss = os_float(
+            "prune_max_log_loss", 0.01, lambda x: x >= 0,
+            "prune_max_log_loss must be greater than or equal to 0"
+        )
+        # Trees (or boosting stages) the pruning keeps at least
+        self.prune_min_estimators = os_int(
+            "prune_min_estimators", 20, lambda x: x > 0,
+            "prune_min_estimators must be greater than 0"
+        )
+        # Fraction of the training rows held out of the training to prune on
+        self.prune_validation = os_float(
+            "prune_validation", 0.1, lambda x: x > 0 and x < 1,
+            "prune_validation must be in the range (0.0, 1.0)"
+        )
+
+        # "latency" deploys the fastest of the best evaluated pipelines which meets the serving
+        # budgets instead of the best pipeline by CV score
+        self.selection = os_param(
+            "selection", "score", lambda x: x in ["score", "latency"],
+            "selection must be one of [score, latency]"
+        )
+        # Budget of the p99 latency of a request of gate_request_rows rows for the selection
+        self.latency_budget_ms = os_float(
+            "latency_budget_ms", 20., lambda x: x > 0,
+            "latency_budget_ms must be greater than 0"
+        )
+        self.size_budget_mb = os_float(
+            "size_budget_mb", None, lambda x: x > 0,
+            "size_budget_mb must be greater than 0"
+        )
+        # Number of the best pipelines by CV score the selection fits and measures
+        self.selection_candidates = os_int(
+            "selection_candidates", 10, lambda x: x > 0,
+            "selection_candidates must be greater than 0"
+        )
+        # CV score a pipeline within the budgets may give up for lower latency
+        self.selection_tolerance = os_float(
+            "selection_tolerance", 0.005, lambda x: x >= 0,
+            "selection_tolerance must be greater than or equal to 0"
+        )
+
+        # Serving cost check of the trained model before it replaces Model.sav: "flag" reports
+        # violated budgets, "enforce" also keeps the previous model
+        self.gate = os_param(
+            "gate", "off", lambda x: x in ["off", "flag", "enforce"],
+            "gate must be one of [off, flag, enforce]"
+        )
+        # Budget of the p99 latency of a request of gate_request_rows rows
+        self.gate_max_latency_ms = os_float(
+            "gate_max_latency_ms", None, lambda x: x > 0,
+            "gate_max_latency_ms must be greater than 0"
+        )
+        # Budget of the rows predicted per second in one batch of gate_sample_rows rows
+        self.gate_min_throughput = os_float(
+            "gate_min_throughput", None, lambda x: x > 0,
+            "gate_min_throughput must be greater than 0"
+        )
+        self.gate_max_size_mb = os_float(
+            "gate_max_size_mb", None, lambda x: x > 0,
+            "gate_max_size_mb must be greater than 0"
+        )
+        # How many times worse than the previous model latency, throughput and size may get
+        self.gate_max_regression = os_float(
+            "gate_max_regression", 2.0, lambda x: x >= 1,
+            "gate_max_regression must be greater than or equal to 1"
+        )
+        self.gate_sample_rows = os_int(
+            "gate_sample_rows", 1000, lambda x: x > 0,
+            "gate_sample_rows must be greater than 0"
+        )
+        self.gate_request_rows = os_int(
+            "gate_request_rows", 1, lambda x: x > 0,
+            "gate_request_rows must be greater than 0"
+        )
+
+        #####################################
+        #      auto-sklearn Parameters      #
+        #####################################
+
+        # "cv" evaluates the runs with cv folds and refits the final ensemble on all rows
+        self.autosklearn_resampling = os_param(
+            "autosklearn_resampling", "holdout", lambda x: x in ["holdout", "cv"],
+            "autosklearn_resampling must be one of [holdout, cv]"
+        )
+        self.autosklearn_ensemble_size = os_int(
+            "autosklearn_ensemble_size", 50, lambda x: x > 0,
+            "autosklearn_ensemble_size must be greater than 0"
+        )
+        # Number of the best runs the ensemble is built from
+        self.autosklearn_ensemble_nbest = os_int(
+            "autosklearn_ensemble_nbest", 50, lambda x: x > 0,
+            "autosklearn_ensemble_nbest must be greater than 0"
+        )
+        # Deploy the members of the final ensemble instead of the AutoSklearnClassifier
+        self.autosklearn_slim = os_flag(
+            "autosklearn_slim", "true"
+        )
+        # Members of the final ensemble with a lower weight are dropped from the deployed model
+        self.autosklearn_ensemble_min_weight = os_float(
+            "autosklearn_ensemble_min_weight", 0.0, lambda x: x >= 0 and x < 1,
+            "autosklearn_ensemble_min_weight must be in the range [0.0, 1.0)"
+        )
 
         #####################################
         #      Process Data Parameters      #
@@ -214,6 +458,83 @@ class Config:
         
         # Check if test data has been selected from the UI
         self.test_data_from_ui = not is_folder_empty(self.test_data_directory)
+
+        #####################################
+        #        Resource Parameters        #
+        #####################################
+
+        # Concurrent pipeline evaluations, -1 uses all available cores
+        self.n_jobs = os_int(
+            "n_jobs", -1, lambda x: x > 0 or x == -1,
+            "n_jobs must be -1 or greater than 0"
+        )
+        # Threads used inside one evaluation, by default the cores are split between jobs
+        self.threads_per_job = os_int(
+            "threads_per_job", None, lambda x: x > 0,
+            "threads_per_job must be greater than 0"
+        )
+        # Memory reserved per concurrent evaluation, by default estimated from the data size
+        self.memory_per_eval_mb = os_int(
+            "memory_per_eval_mb", None, lambda x: x > 0,
+            "memory_per_eval_mb must be greater than 0"
+        )
+
+        # Hard memory ceiling of one evaluation, by default the available memory split between jobs
+        self.max_eval_memory_mb = os_int(
+            "max_eval_memory_mb", None, lambda x: x > 0,
+            "max_eval_memory_mb must be greater than 0"
+        )
+        # Address of a dask scheduler (e.g. tcp://10.0.0.1:8786) to evaluate pipelines on,
+        # its workers must be able to import aiflib
+        self.dask_scheduler = os_param(
+            "dask_scheduler", None, unconditional, ""
+        )
+        # Number of local dask worker processes to evaluate pipelines on
+        self.dask_workers = os_int(
+            "dask_workers", None, lambda x: x > 0,
+            "dask_workers must be greater than 0"
+        )
+
+        #####################################
+        #         Serving Parameters        #
+        #####################################
+
+        # Reload Model.sav when it is replaced, e.g. by snapshots of a running search
+        self.hot_reload = os_flag(
+            "hot_reload", "false"
+        )
+        # "compact" saves model/artifact, one compressed file per pipeline step loaded on demand
+        self.artifact_format = os_param(
+            "artifact_format", "joblib", lambda x: x in ["joblib", "compact"],
+            "artifact_format must be one of [joblib, compact]"
+        )
+        # Write the predict latency histograms to artifacts_directory this often, 0 never writes them
+        self.serving_metrics_interval_secs = os_int(
+            "serving_metrics_interval_secs", 60, lambda x: x >= 0,
+            "serving_metrics_interval_secs must be greater than or equal to 0"
+        )
+
+        #####################################
+        #       Telemetry Parameters        #
+        #####################################
+
+        # Record every pipeline evaluated during the search to artifacts_directory
+        self.telemetry = os_flag(
+            "telemetry", "true"
+        )
+        # Time the aiflib stages and export the timers, counters and peak memory to artifacts_directory
+        self.profiling = os_flag(
+            "profiling", "false"
+        )
+        self.profiling_format = os_param(
+            "profiling_format", "json", lambda x: x in ["json", "prometheus"],
+            "profiling_format must be one of [json, prometheus]"
+        )
+        # Record a cProfile or pyinstrument profile of the train, evaluate and process_data stages
+        self.profile_capture = os_param(
+            "profile_capture", "none", lambda x: x in ["none", "cprofile", "pyinstrument"],
+            "profile_capture must be one of [none, cprofile, pyinstrument]"
+        )
         
         #####################################
         #        Logging Parameters         #
@@ -272,6 +593,15 @@ class Config:
                 "max_features": np.arange(0.05, 1.01, 0.05)
             },
 
+            # sklearn's HistGradientBoostingClassifier reusing the bins of the pre-binned training matrix
+            "aiflib.binning.HistGradientBoostingClassifier": {
+                "max_iter": [100],
+                "learning_rate": [1e-3, 1e-2, 1e-1, 0.5, 1.],
+                "max_leaf_nodes": [7, 15, 31, 63, 127],
+                "min_samples_leaf": [1, 5, 10, 20, 50, 100],
+                "l2_regularization": [0., 1e-3, 1e-2, 1e-1, 1.]
+            },
+
             "sklearn.neighbors.KNeighborsClassifier": {
                 "n_neighbors": range(1, 101),
                 "weights": ["uniform", "distance"],
@@ -407,6 +737,42 @@ class Config:
 
         }
 
+        # Operators of classifier_config_dict which accept sparse input, searched when sparse is set
+        sparse_operators = [
+            "sklearn.naive_bayes.BernoulliNB", "sklearn.naive_bayes.MultinomialNB",
+            "sklearn.ensemble.ExtraTreesClassifier", "sklearn.neighbors.KNeighborsClassifier",
+            "sklearn.svm.LinearSVC", "sklearn.linear_model.LogisticRegression", "sklearn.linear_model.SGDClassifier",
+            "sklearn.preprocessing.Binarizer", "sklearn.preprocessing.MaxAbsScaler", "sklearn.preprocessing.Normalizer",
+            "sklearn.feature_selection.SelectFwe", "sklearn.feature_selection.SelectPercentile",
+            "sklearn.feature_selection.VarianceThreshold", "sklearn.feature_selection.SelectFromModel",
+        ]
+        self.sparse_classifier_config_dict = {
+            operator: self.classifier_config_dict[operator] for operator in sparse_operators
+        }
+        # Pipeline shape searched when sparse is set. Without a template TPOT also places
+        # classifiers inside the pipeline, wrapped in a StackingEstimator which only takes dense
+        # input, so every such pipeline would fail on the CSR matrix
+        self.sparse_template = "Selector-Transformer-Classifier"
+
+        self.xgboost_classifier_config_dict = {
+            "xgboost.XGBClassifier": {
+                "n_estimators": [100, 150, 200],
+                "max_depth": range(1, 11),
+                "learning_rate": [1e-3, 1e-2, 1e-1, 0.5, 1.],
+                "subsample": np.arange(0.05, 0.95, 0.05),
+                "min_child_weight": range(1, 21),
+                "nthread": [1]
+            },
+        }
+        transformer_modules = (
+            "sklearn.preprocessing.", "sklearn.decomposition.", "sklearn.cluster.",
+            "sklearn.kernel_approximation.", "sklearn.feature_selection.", "tpot.builtins.",
+        )
+        self.xgboost_classifier_config_dict.update({
+            operator: parameters for operator, parameters in self.classifier_config_dict.items()
+            if operator.startswith(transformer_modules)
+        })
+
         # Finalize config validation.
         ConfigValidator().finalize()
 
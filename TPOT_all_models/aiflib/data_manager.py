@@ -14,9 +14,12 @@ from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from aiflib.config import Config
+from aiflib.encoding import IdEncoder, SparseEncoder, is_id_column
 from aiflib.logger import Logger
+from aiflib.profiling import profiler, timed
 
 class DataManager():
+    @timed("data_manager.init")
     def __init__(self, directory):
         self.config = Config()
         self.logger = Logger(__name__)
@@ -25,10 +28,13 @@ class DataManager():
         self.feature_column_names = None
         self._label_encoder = self.load_labelencoder() 
         self.is_single_file = self.config.csv_name is not None
+        # (path, number of rows) of every file read, in the order of the rows in the data
+        self.file_rows = []
         
         self.raw_data = self.read_all_data(directory) 
         if self.raw_data is None: return
 
+        profiler().count("data_manager.rows", len(self.raw_data))
         nclasses = self.num_classes()
         self.logger.info(f"Done read [{len(self.raw_data)}] points with [{nclasses}] classes.")
 
@@ -63,11 +69,7 @@ class DataManager():
         help_string = " The csv file must contain a header, a target column and and at least one feature column." \
             " The target column name is set by the <input_column> variable of this run. The default value is 'target'."
 
-        paths = []
-        if self.is_single_file:
-            paths = [os.path.join(directory, self.config.csv_name)]
-        else:
-            paths = glob.glob(os.path.join(directory, "*.csv"), recursive=True)
+        paths = DataManager.csv_paths(directory)
 
         frames = []
         for path in paths:
@@ -88,6 +90,7 @@ class DataManager():
                 continue
 
             frames.append(frame)
+            self.file_rows.append((path, len(frame)))
             self.logger.verbose(f"Read [{len(frame)}] data points from [{path}]\n")
 
         if len(frames) == 0: return None
@@ -131,7 +134,46 @@ class DataManager():
     def checksum(path):
         hasher = hashlib.md5()
         with open(path, 'rb') as infile:
-            hasher.update(infile.read())
+            for chunk in iter(lambda: infile.read(1 << 20), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def csv_paths(directory):
+        config = Config()
+        if config.csv_name is not None:
+            return [os.path.join(directory, config.csv_name)]
+        return glob.glob(os.path.join(directory, "*.csv"), recursive=True)
+
+    @staticmethod
+    def file_checksums(directory):
+        """
+        Checksum of every csv file a DataManager would read from directory, by path
+        relative to directory.
+        """
+        return {
+            os.path.relpath(path, directory): DataManager.checksum(path)
+            for path in DataManager.csv_paths(directory) if os.path.isfile(path)
+        }
+
+    def rows_from(self, paths):
+        """
+        Boolean mask of the rows of the data read from the given files.
+        """
+        return np.concatenate([np.full(rows, path in paths, dtype=bool) for path, rows in self.file_rows])
+
+    @staticmethod
+    def data_checksum(directory):
+        """
+        Checksum of the csv files a DataManager would read from directory and of the
+        parameters used to parse them.
+        """
+        config = Config()
+        hasher = hashlib.md5()
+        hasher.update(f"{config.target_column}|{config.delimiter}|{config.encoding}".encode("utf-8"))
+        for path in sorted(DataManager.csv_paths(directory)):
+            if os.path.isfile(path):
+                hasher.update(f"{os.path.basename(path)}|{DataManager.checksum(path)}".encode("utf-8"))
         return hasher.hexdigest()
         
     def get_classes(self):
@@ -150,6 +192,59 @@ class DataManager():
         self.feature_column_names = list(self.raw_data.drop(self.target_column_name, axis=1).columns)
         return self.feature_column_names
 
+    def get_id_columns(self):
+        """
+        Feature columns holding identifiers, as set by id_columns or detected in the data.
+        """
+        if self.config.id_encoding == "none":
+            return []
+        feature_columns = self.get_feature_columns()
+        if self.config.id_columns is not None:
+            id_columns = [name.strip() for name in self.config.id_columns.split(",")]
+            return [name for name in feature_columns if name in id_columns]
+        return [
+            name for name in feature_columns
+            if np.issubdtype(self.raw_data[name].dtype, np.number)
+            and is_id_column(name, self.raw_data[name].values.astype(np.float64), self.config.id_min_unique)
+        ]
+
+    def get_id_encoder(self):
+        """
+        IdEncoder fitted on the identifier columns, None if there are none.
+        """
+        id_columns = self.get_id_columns()
+        if not id_columns:
+            return None
+        self.logger.info(f"Applying [{self.config.id_encoding}] encoding to identifier columns {id_columns}")
+        feature_columns = self.get_feature_columns()
+        encoder = IdEncoder(
+            columns = [feature_columns.index(name) for name in id_columns],
+            strategy = self.config.id_encoding,
+            n_buckets = self.config.id_hash_buckets)
+        return encoder.fit(self.raw_data[feature_columns].values)
+
+    def get_categorical_columns(self):
+        """
+        Non-numeric feature columns and the feature columns listed in categorical_columns.
+        """
+        listed = []
+        if self.config.categorical_columns is not None:
+            listed = [name.strip() for name in self.config.categorical_columns.split(",")]
+        return [
+            name for name in self.get_feature_columns()
+            if name in listed or not np.issubdtype(self.raw_data[name].dtype, np.number)
+        ]
+
+    def get_sparse_encoder(self):
+        """
+        SparseEncoder fitted on the feature columns.
+        """
+        categorical_columns = self.get_categorical_columns()
+        self.logger.info(f"One-hot encoding categorical columns {categorical_columns} to a sparse matrix")
+        feature_columns = self.get_feature_columns()
+        encoder = SparseEncoder(categorical_columns = [feature_columns.index(name) for name in categorical_columns])
+        return encoder.fit(self.raw_data[feature_columns].values)
+
     def load_labelencoder(self):
         if os.path.isfile(os.path.join(self.config.cur_dir, "model", "LabelEncoder.sav")):
             self.logger.info(f"Loading label encoder...")
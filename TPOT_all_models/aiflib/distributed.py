@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+
+from aiflib.config import Config
+from aiflib.logger import Logger, UiPathUsageException
+
+
+class DistributedEvaluation:
+    """
+    Dispatches TPOT's pipeline evaluations to the workers of a dask cluster.
+
+    While installed it stands in for joblib.Parallel inside TPOT: the training data is
+    scattered to every worker once per search, each candidate is submitted as its own
+    task referencing the scattered data, and results are collected as they complete.
+    Workers must be able to import aiflib (and any operator used in the config dict).
+    """
+    def __init__(self, client, is_local):
+        self.config = Config()
+        self.logger = Logger(__name__)
+        self.client = client
+        self.is_local = is_local
+        self._scattered = {}
+
+    @classmethod
+    @contextmanager
+    def from_config(cls):
+        """
+        Connect to the configured scheduler, or start a local cluster of worker processes.
+        Yields None if distributed evaluation is not configured.
+        """
+        config = Config()
+        if config.dask_scheduler is None and config.dask_workers is None:
+            yield None
+            return
+
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError as e:
+            raise UiPathUsageException(f"Distributed evaluation requires dask[distributed] to be installed: {e}")
+
+        cluster = None
+        if config.dask_scheduler is not None:
+            client = Client(config.dask_scheduler)
+        else:
+            cluster = LocalCluster(n_workers=config.dask_workers, threads_per_worker=1,
+                                   processes=True, dashboard_address=None)
+            client = Client(cluster)
+        try:
+            evaluation = cls(client, is_local = cluster is not None)
+            evaluation.logger.info(f"Evaluating pipelines on [{evaluation.n_jobs}] dask worker threads "
+                                   f"at [{client.scheduler.address}]")
+            yield evaluation
+        finally:
+            client.close()
+            if cluster is not None:
+                cluster.close()
+
+    @property
+    def n_jobs(self):
+        return max(1, sum(self.client.nthreads().values()))
+
+    def plan(self, plan):
+        """
+        Resource plan with one evaluation per dask worker thread.
+        """
+        threads_per_job = self.config.threads_per_job
+        if threads_per_job is None:
+            threads_per_job = max(1, plan.cpu_count // self.n_jobs) if self.is_local else 1
+        return plan._replace(n_jobs = self.n_jobs, threads_per_job = threads_per_job)
+
+    def scatter(self, value):
+        if not isinstance(value, np.ndarray):
+            return value
+        key = id(value)
+        if key not in self._scattered:
+            # Keep a reference to the array so that its id can't be reused during the search
+            self._scattered[key] = (value, self.client.scatter(value, broadcast=True, hash=False))
+        return self._scattered[key][1]
+
+    def __call__(self, n_jobs=None, verbose=0, pre_dispatch=None, **kwargs):
+        # Same signature as joblib.Parallel, as constructed by TPOT
+        return self.run
+
+    def run(self, tasks):
+        from dask.distributed import as_completed
+
+        futures = []
+        for function, args, kwargs in tasks:
+            if isinstance(function, partial):
+                args = function.args + tuple(args)
+                kwargs = dict(function.keywords, **kwargs)
+                function = function.func
+            kwargs = {name: self.scatter(value) for name, value in kwargs.items()}
+            futures.append(self.client.submit(function, *args, pure=False, **kwargs))
+
+        positions = {future.key: position for position, future in enumerate(futures)}
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            try:
+                results[positions[future.key]] = future.result()
+            except Exception as e:
+                self.logger.info(f"Pipeline evaluation failed on a worker: {e}")
+                results[positions[future.key]] = -float("inf")
+        return results
+
+    @contextmanager
+    def installed(self):
+        """
+        Replace the joblib.Parallel used by TPOT by this dispatcher for the duration of the block.
+        """
+        import tpot.base
+        original = tpot.base.Parallel
+        tpot.base.Parallel = self
+        try:
+            yield self
+        finally:
+            tpot.base.Parallel = original
+            self._scattered = {}
@@ -0,0 +1,149 @@
+import re
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Column names which look like identifiers: user_id, adId, url_hash, id, ...
+_ID_NAME = re.compile(r"(^|[_\s])(id|Id|ID|hash|Hash|HASH)$|[a-z0-9](Id|ID|Hash)$")
+
+# Fibonacci hashing multiplier
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def is_id_column(name, values, min_unique):
+    """
+    Whether a numeric column holds identifiers: integer values with at least min_unique
+    distinct values, and either an identifier-like name or mostly unique values.
+    """
+    observed = values[~np.isnan(values)]
+    if len(observed) == 0 or not np.all(np.mod(observed, 1) == 0):
+        return False
+    n_unique = len(np.unique(observed))
+    return n_unique >= min_unique and (_ID_NAME.search(str(name)) is not None or n_unique >= 0.5 * len(observed))
+
+
+class IdEncoder(BaseEstimator, TransformerMixin):
+    """
+    Replaces high-cardinality identifier columns by compact numeric features and converts
+    the matrix to float32.
+
+    "frequency" replaces each identifier by its rank among the identifiers seen in training,
+    which keeps their order (identifiers are often allocated over time) with small exact
+    values, and appends a column with its relative frequency in the training data.
+    Unseen identifiers rank halfway between their neighbours and have a frequency of 0.
+    "hash" replaces each identifier by one of n_buckets buckets (a power of 2).
+
+    Missing values are kept for the imputer. The identifiers are encoded from the float64
+    input, before float32 would merge distinct large identifiers.
+    """
+    def __init__(self, columns=(), strategy="frequency", n_buckets=65536):
+        self.columns = columns
+        self.strategy = strategy
+        self.n_buckets = n_buckets
+
+    def fit(self, X, y=None):
+        X = np.asarray(X)
+        self.values_ = []
+        self.frequencies_ = []
+        if self.strategy == "frequency":
+            for column in self.columns:
+                values = X[:, column].astype(np.float64)
+                observed = values[~np.isnan(values)]
+                values, counts = np.unique(observed, return_counts=True)
+                self.values_.append(values)
+                self.frequencies_.append((counts / max(1, len(X))).astype(np.float32))
+        return self
+
+    def _hash(self, values):
+        bits = int(np.log2(self.n_buckets))
+        with np.errstate(over="ignore"):
+            hashed = (values.view(np.uint64) * _HASH_MULTIPLIER) >> np.uint64(64 - bits)
+        return hashed.astype(np.float32)
+
+    def transform(self, X):
+        X = np.asarray(X)
+        n_columns = X.shape[1] + (len(self.columns) if self.strategy == "frequency" else 0)
+        encoded = np.empty((X.shape[0], n_columns), dtype=np.float32)
+        encoded[:, :X.shape[1]] = X
+        for position, column in enumerate(self.columns):
+            values = np.ascontiguousarray(X[:, column], dtype=np.float64)
+            missing = np.isnan(values)
+            if self.strategy == "frequency":
+                known = self.values_[position]
+                rank = np.searchsorted(known, values)
+                index = np.minimum(rank, max(0, len(known) - 1))
+                found = (rank < len(known)) & (known[index] == values) if len(known) else np.zeros(len(values), dtype=bool)
+                encoded[:, column] = np.where(found, rank, rank - 0.5)
+                encoded[:, X.shape[1] + position] = np.where(found, self.frequencies_[position][index], 0)
+                encoded[missing, X.shape[1] + position] = np.nan
+            else:
+                encoded[:, column] = self._hash(values)
+            encoded[missing, column] = np.nan
+        return encoded
+
+
+def _category_label(value):
+    # The same category read as 1.0 in training (a float column with missing values) and
+    # sent as 1 when serving must match: integral numbers are labelled as integers
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return "nan"
+        if float(value).is_integer():
+            return str(int(value))
+    elif value is None:
+        return "nan"
+    elif isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    elif isinstance(value, (int, np.integer)):
+        return str(int(value))
+    return str(value)
+
+
+_label_values = np.frompyfunc(_category_label, 1, 1)
+
+
+def _category_labels(values):
+    return _label_values(values).astype(str)
+
+
+class SparseEncoder(BaseEstimator, TransformerMixin):
+    """
+    Encodes a matrix with categorical columns to a float32 CSR matrix: the other columns
+    are mean-imputed and kept in front, followed by a one-hot column for every category
+    seen in training. Unseen categories encode to no column; missing values are a category.
+Integral numbers are the same category whatever their type, so 1.0 matches 1.
+
+    Already encoded sparse input (with the encoded number of columns) is passed through,
+    so clients may also send CSR matrices.
+    """
+    def __init__(self, categorical_columns=()):
+        self.categorical_columns = categorical_columns
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=object)
+        self.numeric_columns_ = [column for column in range(X.shape[1]) if column not in self.categorical_columns]
+        numeric = X[:, self.numeric_columns_].astype(np.float64)
+        counts = (~np.isnan(numeric)).sum(axis=0)
+        self.means_ = np.where(counts > 0, np.nansum(numeric, axis=0) / np.maximum(counts, 1), 0.).astype(np.float32)
+        self.categories_ = [np.unique(_category_labels(X[:, column])) for column in self.categorical_columns]
+        self.n_features_out_ = len(self.numeric_columns_) + sum(len(categories) for categories in self.categories_)
+        return self
+
+    def transform(self, X):
+        if sparse.issparse(X) and X.shape[1] == self.n_features_out_:
+            return X.tocsr().astype(np.float32)
+        X = np.asarray(X, dtype=object)
+
+        numeric = X[:, self.numeric_columns_].astype(np.float32)
+        np.copyto(numeric, self.means_, where=np.isnan(numeric))
+        blocks = [sparse.csr_matrix(numeric)]
+
+        for column, categories in zip(self.categorical_columns, self.categories_):
+            values = _category_labels(X[:, column])
+            code = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+            found = categories[code] == values
+            blocks.append(sparse.csr_matrix(
+                (np.ones(found.sum(), dtype=np.float32), (np.flatnonzero(found), code[found])),
+                shape=(X.shape[0], len(categories))))
+        return sparse.hstack(blocks, format="csr", dtype=np.float32)
@@ -0,0 +1,570 @@
+import copy
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import train_test_split
+from sklearn.utils.validation import check_is_fitted
+
+from aiflib.checkpoint import SearchCheckpoint, BestPipelineSnapshot
+from aiflib.config import Config, comma_separated
+from aiflib.distributed import DistributedEvaluation
+from aiflib.evaluation import PipelineEvaluator
+from aiflib.logger import Logger, UiPathUsageException
+from aiflib.profiling import profiler
+from aiflib.resources import ResourceGovernor, available_cpus
+from aiflib.search import class_priors, search_subsample
+from aiflib.xgboost_search import XGBoostSearch
+
+# How often the scheduler reports the progress of concurrently running engines
+_PROGRESS_SECS = 60
+# Held by the exclusive engine which is fitting
+_exclusive = threading.Lock()
+
+
+class SearchEngine:
+    """
+    Interface of a pipeline search engine plugged into Model.search.
+
+    fit(X, y, max_time_mins, cpus) searches pipelines for the preprocessed X within
+    max_time_mins minutes on cpus cores (all available ones if None) and keeps the best
+    one, fitted, in fitted_. refit(X, y) refits it on other rows, export(directory) writes
+    a description of it and progress() reports the state of a running search.
+    The fitted pipeline is deployed as the (step_name, fitted_) final step of the model.
+
+    Exclusive engines patch process wide state while they fit (module globals of the
+    libraries they drive, os.environ), so at most one of them fits at a time in a process;
+    the thread pools they pin through os.environ also apply to the processes the other
+    engines start, which set their own thread counts explicitly.
+    """
+    name = None
+    step_name = None
+    exclusive = False
+
+    def __init__(self, model, preprocessing, X_raw):
+        self.model = model
+        self.config = model.config
+        self.logger = Logger(__name__)
+        self.preprocessing = preprocessing
+        self.X_raw = X_raw
+        self.fitted_ = None
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    def fit(self, X, y, max_time_mins, cpus=None):
+        raise NotImplementedError
+
+    def refit(self, X, y):
+        self.fitted_.fit(X, y)
+        return self
+
+    def export(self, directory):
+        pass
+
+    def best_score(self):
+        """
+        Best internal validation score of the search so far, None if unknown.
+        """
+        return None
+
+    def evaluated(self):
+        """
+        Number of pipelines evaluated so far, None if unknown.
+        """
+        return None
+
+    def progress(self):
+        if self.error is not None:
+            state = "failed" if self.started_at is not None else "skipped"
+        elif self.finished_at is not None:
+            state = "finished"
+        elif self.started_at is not None:
+            state = "running"
+        else:
+            state = "pending"
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "engine": self.name,
+            "state": state,
+            "elapsed_seconds": elapsed,
+            "evaluated": self.evaluated(),
+            "best_score": self.best_score(),
+            "error": None if self.error is None else str(self.error),
+        }
+
+
+class TPOTEngine(SearchEngine):
+    """
+    Genetic programming search of TPOT over the operators of the config dict, with the
+    checkpoints, snapshots, telemetry, dask evaluation and latency selection of aiflib.
+    """
+    name = "tpot"
+    step_name = "tpot_pipeline"
+    # Installs its evaluator into tpot.base and pins the thread pools through os.environ
+    exclusive = True
+
+    def __init__(self, model, preprocessing, X_raw):
+        super(TPOTEngine, self).__init__(model, preprocessing, X_raw)
+        self.optimizer = None
+
+    def fit(self, X, y, max_time_mins, cpus=None):
+        config, model, preprocessing = self.config, self.model, self.preprocessing
+        # Draw the rows to search on, unless TPOT samples them uniformly itself
+        X_search, y_search = X, y
+        if config.subsample_strategy != "uniform":
+            X_search, y_search = search_subsample(X, y, config.subsample, config.subsample_strategy, config.seed)
+            self.logger.info(f"Searching on a [{config.subsample_strategy}] subsample of [{len(y_search)}] rows")
+            self.report_subsample(y, y_search)
+
+        # Split the cores between concurrent evaluations and the estimators inside them
+        governor = ResourceGovernor()
+        plan = governor.plan(X_search, cpus)
+
+        # Periodically checkpoint the search and keep the best pipeline so far in Model.sav
+        data_hash = joblib.hash((X, y))
+        state = SearchCheckpoint.load(model.checkpoint_path(), data_hash) if config.resume else None
+        checkpoint = None
+        if config.checkpoint_interval_mins > 0:
+            checkpoint = SearchCheckpoint(
+                model.checkpoint_path(), config.checkpoint_interval_mins, data_hash, state,
+                on_new_best=lambda optimizer: model.save_best_pipeline(optimizer, preprocessing, X, y),
+                training_hash=model.training_hash)
+
+        log_path = os.path.join(config.artifacts_directory, "evaluations.jsonl")
+        with ExitStack() as stack:
+            # Fan evaluations out to a dask cluster if one is configured
+            distributed = stack.enter_context(DistributedEvaluation.from_config())
+            if distributed is not None:
+                plan = distributed.plan(plan)
+                stack.enter_context(distributed.installed())
+            governor.pin_threads(plan)
+
+            evaluator = PipelineEvaluator(
+                log_path if config.telemetry else None,
+                threads=plan.threads_per_job,
+                memory_limit_mb=governor.eval_memory_limit_mb(plan))
+            if not config.warm_start and state is None:
+                evaluator.reset()
+            stack.enter_context(evaluator.installed())
+
+            # Fit TPOT to data
+            self.optimizer = pipeline_optimizer = model.create_optimizer(governor, plan, state, max_time_mins)
+            if checkpoint is not None:
+                pipeline_optimizer.generation_callbacks.append(checkpoint)
+            if config.snapshot_best:
+                pipeline_optimizer.generation_callbacks.append(BestPipelineSnapshot(
+                    lambda optimizer: model.save_best_pipeline(
+                        optimizer, preprocessing, X, y, subsample=config.snapshot_subsample)))
+            with profiler().timer("model.build_model.search"):
+                pipeline_optimizer.fit(X_search, y_search)
+
+        if config.selection == "latency":
+            with profiler().timer("model.build_model.selection"):
+                model.select_pipeline(pipeline_optimizer, preprocessing, X_search, y_search, self.X_raw)
+
+        if config.subsample < 1.0 and config.subsample_refit:
+            self.logger.info(f"Refitting the best pipeline on all [{len(y)}] training rows")
+            with profiler().timer("model.build_model.refit"):
+                pipeline_optimizer.fitted_pipeline_.fit(X, y)
+
+        if checkpoint is not None:
+            checkpoint.remove()
+        if config.telemetry:
+            model.log_telemetry(evaluator)
+        self.logger.info(f"Finished running TPOT optimization pipeline.")
+        self.fitted_ = pipeline_optimizer.fitted_pipeline_
+        return self
+
+    def report_subsample(self, y, y_search):
+        """
+        Write the class priors of the training rows and of the search subsample to
+        artifacts_directory/search_subsample.json, logging them if they differ.
+        """
+        report = {
+            "strategy": self.config.subsample_strategy,
+            "scoring": self.config.scoring,
+            "rows": len(y),
+            "search_rows": len(y_search),
+            "priors": class_priors(y),
+            "search_priors": class_priors(y_search),
+        }
+        shift = max(abs(report["search_priors"].get(label, 0.) - prior) for label, prior in report["priors"].items())
+        report["max_prior_shift"] = shift
+        if shift > 0.01:
+            self.logger.info(f"The search subsample has class priors {report['search_priors']} instead of "
+                             f"{report['priors']}: candidates are scored with [{self.config.scoring}] under the "
+                             f"search priors, the deployed pipeline is fitted under the training ones")
+        with open(os.path.join(self.config.artifacts_directory, "search_subsample.json"), "w") as report_file:
+            json.dump(report, report_file)
+
+    def export(self, directory):
+        # Export fitted pipeline to artifacts directory
+        pipeline_path = os.path.join(directory, "TPOT_pipeline.py")
+        self.optimizer.export(pipeline_path)
+        self.logger.info(f"Saving best pipeline to {pipeline_path}")
+
+    def best_score(self):
+        return getattr(self.optimizer, "_optimized_pipeline_score", None)
+
+    def evaluated(self):
+        evaluated_individuals = getattr(self.optimizer, "evaluated_individuals_", None)
+        return None if evaluated_individuals is None else len(evaluated_individuals)
+
+
+class WeightedEnsemble(BaseEstimator, ClassifierMixin):
+    """
+    Weighted soft vote of classifiers whose predict_proba columns are classes (those of y
+    if None): the final ensemble of auto-sklearn without the AutoML object, its run history,
+    data and temporary directory. from_fitted builds it from already fitted members, fit
+    fits copies of the estimators.
+    """
+    def __init__(self, estimators, weights, classes=None):
+        self.estimators = estimators
+        self.weights = weights
+        self.classes = classes
+
+    @classmethod
+    def from_fitted(cls, estimators, weights, classes):
+        ensemble = cls(estimators, weights, classes)
+        ensemble.estimators_ = list(estimators)
+        ensemble.classes_ = np.asarray(classes)
+        return ensemble
+
+    @staticmethod
+    def _copy(estimator):
+        try:
+            return clone(estimator)
+        except (TypeError, RuntimeError):
+            # Members which do not implement get_params
+            return copy.deepcopy(estimator)
+
+    def fit(self, X, y):
+        self.estimators_ = [self._copy(estimator).fit(X, y) for estimator in self.estimators]
+        self.classes_ = np.unique(y) if self.classes is None else np.asarray(self.classes)
+        return self
+
+    def predict_proba(self, X):
+        check_is_fitted(self)
+        probabilities = sum(weight * estimator.predict_proba(X) for weight, estimator in zip(self.weights, self.estimators_))
+        return probabilities / sum(self.weights)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class AutoSklearnEngine(SearchEngine):
+    """
+    Bayesian optimisation and ensemble building of auto-sklearn, an optional dependency.
+
+    The budget is split like TPOT's: workers and their memory from the resource plan
+    (n_jobs, max_eval_memory_mb), per-run time limit from max_eval_time_mins if set, else a
+    tenth of the budget. Unless autosklearn_slim is off, the model deploys the members of the
+    final ensemble as a WeightedEnsemble rather than the AutoSklearnClassifier.
+    """
+    name = "autosklearn"
+    step_name = "auto_sklearn"
+
+    def __init__(self, model, preprocessing, X_raw):
+        super(AutoSklearnEngine, self).__init__(model, preprocessing, X_raw)
+        self.automl = None
+        self.classes = None
+
+    def options(self, X, max_time_mins, cpus=None):
+        """
+        Arguments of AutoSklearnClassifier for a search on X within max_time_mins on cpus cores.
+        """
+        import autosklearn.metrics
+
+        config = self.config
+        governor = ResourceGovernor()
+        plan = governor.plan(X, cpus)
+        time_left = max(30, int(60 * max_time_mins))
+        per_run_time_limit = time_left // 10
+        if "max_eval_time_mins" in config.specified_parameters:
+            per_run_time_limit = 60 * config.max_eval_time_mins
+        options = {
+            "time_left_for_this_task": time_left,
+            "per_run_time_limit": max(1, min(per_run_time_limit, time_left)),
+            "n_jobs": plan.n_jobs,
+            "memory_limit": governor.eval_memory_limit_mb(plan),
+            "ensemble_size": config.autosklearn_ensemble_size,
+            "ensemble_nbest": config.autosklearn_ensemble_nbest,
+            "resampling_strategy": config.autosklearn_resampling,
+            "seed": config.seed,
+        }
+        if config.autosklearn_resampling == "cv":
+            options["resampling_strategy_arguments"] = {"folds": config.cv}
+        # Optimise the same metric as TPOT where auto-sklearn has it
+        metric = getattr(autosklearn.metrics, config.scoring, None)
+        if metric is not None:
+            options["metric"] = metric
+        return options
+
+    def fit(self, X, y, max_time_mins, cpus=None):
+        try:
+            import autosklearn.classification
+        except ImportError as e:
+            raise UiPathUsageException(f"engine [autosklearn] requires auto-sklearn to be installed: {e}")
+
+        options = self.options(X, max_time_mins, cpus)
+        self.logger.info(f"auto-sklearn budget: [{options['time_left_for_this_task']}] s, [{options['per_run_time_limit']}] s "
+                         f"per run on [{options['n_jobs']}] workers of [{options['memory_limit']}] MB, "
+                         f"[{options['resampling_strategy']}] resampling, ensemble of [{options['ensemble_size']}]")
+        self.automl = autosklearn.classification.AutoSklearnClassifier(**options)
+        self.classes = np.unique(y)
+        with profiler().timer("model.build_model.search"):
+            self.automl.fit(X, y)
+        if self.config.autosklearn_resampling == "cv":
+            # The models of cross-validation runs are only fitted on folds
+            with profiler().timer("model.build_model.refit"):
+                self.automl.refit(X, y)
+        self.logger.info(f"Finished running auto-sklearn:\n{self.automl.sprint_statistics()}")
+        self.fitted_ = self.slim() if self.config.autosklearn_slim else self.automl
+        return self
+
+    def slim(self):
+        """
+        The final ensemble as a WeightedEnsemble of its members with at least
+        autosklearn_ensemble_min_weight of the weight (and at least the heaviest member).
+        """
+        members = sorted(self.automl.get_models_with_weights(), key=lambda member: -member[0])
+        kept = [member for member in members if member[0] >= self.config.autosklearn_ensemble_min_weight] or members[:1]
+        self.logger.info(f"Serving [{len(kept)}] of the [{len(members)}] members of the auto-sklearn ensemble, "
+                         f"[{sum(weight for weight, _ in kept):.3f}] of its weight")
+        return WeightedEnsemble.from_fitted(
+            [estimator for _, estimator in kept], [weight for weight, _ in kept], self.classes)
+
+    def refit(self, X, y):
+        self.automl.refit(X, y)
+        self.classes = np.unique(y)
+        self.fitted_ = self.slim() if self.config.autosklearn_slim else self.automl
+        return self
+
+    def export(self, directory):
+        models_path = os.path.join(directory, "auto_sklearn_models.txt")
+        with open(models_path, "w") as models_file:
+            models_file.write(self.automl.sprint_statistics() + "\n\n" + str(self.automl.show_models()) + "\n")
+        self.logger.info(f"Saving the auto-sklearn ensemble to {models_path}")
+
+    def best_score(self):
+        try:
+            return float(np.nanmax(self.automl.cv_results_["mean_test_score"]))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def evaluated(self):
+        try:
+            return len(self.automl.cv_results_["params"])
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+
+class XGBoostEngine(SearchEngine):
+    """
+    Search of the XGBClassifier parameters of the xgboost config dict on xgboost's native
+    API with early stopping (see aiflib.xgboost_search), without TPOT's preprocessors.
+    """
+    name = "xgboost"
+    step_name = "xgboost"
+
+    def __init__(self, model, preprocessing, X_raw):
+        super(XGBoostEngine, self).__init__(model, preprocessing, X_raw)
+        self.search = None
+
+    def fit(self, X, y, max_time_mins, cpus=None):
+        config = self.config
+        self.search = XGBoostSearch(
+            config.xgboost_classifier_config_dict["xgboost.XGBClassifier"],
+            scoring=config.scoring,
+            cv=config.cv,
+            max_time_mins=max_time_mins,
+            early_stopping_rounds=config.xgboost_early_stopping_rounds,
+            nthread=available_cpus() if cpus is None else cpus,
+            random_state=config.seed)
+        with profiler().timer("model.build_model.search"):
+            self.search.search(X, y)
+        with profiler().timer("model.build_model.refit"):
+            self.fitted_ = self.search.best_classifier().fit(X, y)
+        return self
+
+    def export(self, directory):
+        search_path = os.path.join(directory, "xgboost_search.json")
+        with open(search_path, "w") as search_file:
+            json.dump({
+                "best_params": self.search.best_params_,
+                "best_rounds": self.search.best_rounds_,
+                "best_score": self.search.best_score_,
+                "candidates": self.search.results_,
+            }, search_file, default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+        self.logger.info(f"Saving the xgboost search results to {search_path}")
+
+    def best_score(self):
+        return None if self.search is None else self.search.best_score_
+
+    def evaluated(self):
+        return None if self.search is None else len(self.search.results_)
+
+
+ENGINES = {engine.name: engine for engine in [TPOTEngine, AutoSklearnEngine, XGBoostEngine]}
+
+
+def create_engines(names, model, preprocessing, X_raw):
+    """
+    Engines of the comma separated names, in order and without duplicates.
+    """
+    engines = []
+    for name in dict.fromkeys(comma_separated(names)):
+        if name not in ENGINES:
+            raise UiPathUsageException(f"Unknown search engine [{name}], choose from {sorted(ENGINES)}")
+        engines.append(ENGINES[name](model, preprocessing, X_raw))
+    return engines
+
+
+class EngineScheduler:
+    """
+    Runs search engines within one time budget of max_time_mins and keeps the best one.
+
+    A single engine searches on all rows and cores for the whole budget. With several,
+    "concurrent" runs all of them at once until the end of the budget, each on its share of
+    the cores (exclusive engines one after the other), while "sequential" runs them one
+    after the other on all cores, each for an even share of the budget left. Engines
+    which would start after the end of the budget are skipped. They search on the same rows, the holdout fraction of the
+    training rows is kept aside to score their best pipelines with the scoring metric;
+    the best one is refitted on all rows. The progress and scores of the engines are
+    written to artifacts_directory/engines.json.
+    """
+    def __init__(self, engines, max_time_mins, schedule="concurrent", holdout=0.2):
+        self.config = Config()
+        self.logger = Logger(__name__)
+        self.engines = engines
+        self.max_time_mins = max_time_mins
+        self.schedule = schedule
+        self.holdout = holdout
+        self.scores = {}
+
+    def core_shares(self, cpus):
+        """
+        Cores of every engine running concurrently, as even as possible and at least one.
+        """
+        count = len(self.engines)
+        return [max(1, cpus // count + (1 if index < cpus % count else 0)) for index in range(count)]
+
+    def run(self, X, y):
+        deadline = time.time() + 60. * self.max_time_mins
+        if len(self.engines) == 1:
+            engine = self.engines[0]
+            self._fit(engine, X, y, deadline, None)
+            if engine.error is not None:
+                raise engine.error
+            return engine
+
+        can_stratify = self.holdout * len(y) >= len(np.unique(y))
+        X_search, X_holdout, y_search, y_holdout = train_test_split(
+            X, y,
+            test_size=self.holdout,
+            random_state=self.config.seed,
+            stratify=y if can_stratify else None)
+        self.logger.info(f"Running engines {[engine.name for engine in self.engines]} {self.schedule}ly within "
+                         f"[{self.max_time_mins}] minutes, comparing them on [{len(y_holdout)}] held out rows")
+
+        if self.schedule == "concurrent":
+            self._run_concurrent(X_search, y_search, deadline)
+        else:
+            self._run_sequential(X_search, y_search, deadline)
+
+        scorer = get_scorer(self.config.scoring)
+        for engine in self.engines:
+            if engine.error is not None:
+                continue
+            try:
+                self.scores[engine.name] = float(scorer(engine.fitted_, X_holdout, y_holdout))
+            except Exception as e:
+                engine.error = e
+                self.logger.info(f"Could not score engine [{engine.name}]: {e}")
+        self.write_report()
+
+        if not self.scores:
+            raise next(engine.error for engine in self.engines if engine.error is not None)
+        best = max(self.engines, key=lambda engine: self.scores.get(engine.name, -np.inf))
+        self.logger.info(f"Engine [{best.name}] has the best hold-out {self.config.scoring} "
+                         f"[{self.scores[best.name]:.5f}] of {self.scores}, refitting it on all [{len(y)}] rows")
+        with profiler().timer(f"engine.{best.name}.refit"):
+            best.refit(X, y)
+        return best
+
+    def _fit(self, engine, X, y, deadline, cpus):
+        """
+        Fit engine until deadline, once no other exclusive engine is fitting if it is exclusive.
+        """
+        with _exclusive if engine.exclusive else ExitStack():
+            max_time_mins = (deadline - time.time()) / 60.
+            if max_time_mins <= 0:
+                engine.error = UiPathUsageException(f"no time left in the budget of [{self.max_time_mins}] minutes")
+                self.logger.info(f"Skipping engine [{engine.name}]: {engine.error}")
+                return
+            self.logger.info(f"Starting engine [{engine.name}] for [{max_time_mins:.2f}] minutes"
+                             + ("" if cpus is None else f" on [{cpus}] cores"))
+            engine.started_at = time.time()
+            try:
+                with profiler().timer(f"engine.{engine.name}"):
+                    engine.fit(X, y, max_time_mins, cpus)
+            except Exception as e:
+                engine.error = e
+                self.logger.info(f"Engine [{engine.name}] failed: {e}")
+            finally:
+                engine.finished_at = time.time()
+
+    def _run_concurrent(self, X, y, deadline):
+        threads = []
+        for engine, cpus in zip(self.engines, self.core_shares(available_cpus())):
+            thread = threading.Thread(
+                target=self._fit, args=(engine, X, y, deadline, cpus), name=f"engine-{engine.name}")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(_PROGRESS_SECS)
+                if thread.is_alive():
+                    self.log_progress()
+
+    def _run_sequential(self, X, y, deadline):
+        for index, engine in enumerate(self.engines):
+            # Engines which stop early leave their time to the next ones
+            share = (deadline - time.time()) / (len(self.engines) - index)
+            self._fit(engine, X, y, time.time() + share, None)
+            self.log_progress()
+
+    def log_progress(self):
+        for engine in self.engines:
+            progress = engine.progress()
+            self.logger.info(f"Engine [{progress['engine']}] {progress['state']}, [{progress['evaluated']}] pipelines "
+                             f"evaluated, best score [{progress['best_score']}]")
+        self.write_report()
+
+    def report(self):
+        return {
+            "schedule": self.schedule,
+            "max_time_mins": self.max_time_mins,
+            "holdout": self.holdout,
+            "scoring": self.config.scoring,
+            "engines": [dict(engine.progress(), holdout_score=self.scores.get(engine.name))
+                        for engine in self.engines],
+        }
+
+    def write_report(self):
+        path = os.path.join(self.config.artifacts_directory, "engines.json")
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as report_file:
+            json.dump(self.report(), report_file)
+        os.replace(temporary_path, path)
@@ -0,0 +1,268 @@
+import json
+import os
+import time
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, check_scoring, f1_score, log_loss, roc_auc_score
+from sklearn.model_selection import check_cv
+from sklearn.pipeline import Pipeline, FeatureUnion
+from sklearn.utils.metaestimators import _safe_split
+from stopit import ThreadingTimeout, TimeoutException
+from threadpoolctl import threadpool_limits
+
+from aiflib.binning import fold
+from aiflib.resources import memory_limit
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def describe_pipeline(estimator):
+    """
+    Compact, human readable description of a (possibly nested) scikit-learn pipeline,
+    e.g. "StandardScaler -> ExtraTreesClassifier".
+    """
+    if isinstance(estimator, Pipeline):
+        return " -> ".join(describe_pipeline(step) for _, step in estimator.steps)
+    if isinstance(estimator, FeatureUnion):
+        return "Union({})".format(", ".join(describe_pipeline(step) for _, step in estimator.transformer_list))
+    if hasattr(estimator, "estimator") and type(estimator).__name__ == "StackingEstimator":
+        return "Stacking({})".format(describe_pipeline(estimator.estimator))
+    return type(estimator).__name__
+
+
+def pipeline_operators(estimator):
+    """
+    Flat list of the operator names used in a (possibly nested) scikit-learn pipeline.
+    """
+    if isinstance(estimator, Pipeline):
+        return [name for _, step in estimator.steps for name in pipeline_operators(step)]
+    if isinstance(estimator, FeatureUnion):
+        return [name for _, step in estimator.transformer_list for name in pipeline_operators(step)]
+    if hasattr(estimator, "estimator") and type(estimator).__name__ == "StackingEstimator":
+        return pipeline_operators(estimator.estimator)
+    return [type(estimator).__name__]
+
+
+def _reset_peak_rss():
+    # Linux only: writing "5" resets the VmHWM (peak RSS) counter of this process
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except (IOError, OSError):
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.
+    except (IOError, OSError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    return None
+
+
+def holdout_metrics(model, X, y):
+    """
+    Accuracy, F1, ROC-AUC and log loss of a fitted classifier from a single prediction
+    pass over the hold-out set. ROC-AUC and log loss need predict_proba.
+    """
+    classes = model.classes_
+    try:
+        probabilities = model.predict_proba(X)
+    except Exception:
+        probabilities = None
+    predictions = classes[np.argmax(probabilities, axis=1)] if probabilities is not None else model.predict(X)
+
+    binary = len(classes) == 2
+    metrics = {
+        "accuracy": accuracy_score(y, predictions),
+        "f1": f1_score(y, predictions, labels=classes, pos_label=classes[-1],
+                       average="binary" if binary else "macro"),
+    }
+    if probabilities is not None:
+        try:
+            metrics["roc_auc"] = roc_auc_score(
+                y, probabilities[:, 1] if binary else probabilities,
+                multi_class="raise" if binary else "ovr", labels=None if binary else classes)
+        except ValueError:
+            # Only one class present in y
+            metrics["roc_auc"] = None
+        metrics["log_loss"] = log_loss(y, probabilities, labels=classes)
+    return metrics
+
+
+class PipelineEvaluator:
+    """
+    Cross-validation scorer installed in place of TPOT's internal one. Every candidate
+    evaluation is appended as one json line (pipeline, per fold fit/score time, peak
+    memory, score and status) to the telemetry log, if one is given. An evaluation
+    allocating more than memory_limit_mb is aborted and scored as failed.
+    """
+    def __init__(self, log_path=None, threads=None, memory_limit_mb=None):
+        self.log_path = log_path
+        self.threads = threads
+        self.memory_limit_mb = memory_limit_mb
+
+    def __call__(self, sklearn_pipeline, features, target, cv, scoring_function,
+                 sample_weight=None, groups=None, timeout=None, use_dask=False):
+        if use_dask:
+            from tpot.gp_deap import _wrapped_cross_val_score
+            return _wrapped_cross_val_score(
+                sklearn_pipeline, features, target, cv, scoring_function,
+                sample_weight=sample_weight, groups=groups, timeout=timeout, use_dask=use_dask)
+
+        record = {
+            "pipeline": describe_pipeline(sklearn_pipeline),
+            "operators": pipeline_operators(sklearn_pipeline),
+            "fit_time": [],
+            "score_time": [],
+            "status": "ok",
+        }
+        _reset_peak_rss()
+        start = time.time()
+
+        evaluate = lambda: self._cross_val_score(
+            record, sklearn_pipeline, features, target, cv, scoring_function, sample_weight, groups)
+        timed_out = False
+        if timeout:
+            guard = ThreadingTimeout(timeout)
+            with guard:
+                score = evaluate()
+            timed_out = guard.state == ThreadingTimeout.TIMED_OUT
+        else:
+            score = evaluate()
+
+        if timed_out:
+            record["status"] = "timeout"
+            score = "Timeout"
+
+        record["time"] = round(time.time() - start, 4)
+        record["peak_rss_mb"] = _peak_rss_mb()
+        record["score"] = score if isinstance(score, float) and np.isfinite(score) else None
+        self.write(record)
+        return score
+
+    def _cross_val_score(self, record, sklearn_pipeline, features, target, cv, scoring_function,
+                         sample_weight, groups):
+        try:
+            cv = check_cv(cv, target, classifier=True)
+            scorer = check_scoring(sklearn_pipeline, scoring=scoring_function)
+            scores = []
+            with warnings.catch_warnings(), threadpool_limits(limits=self.threads), \
+                    memory_limit(self.memory_limit_mb):
+                warnings.simplefilter("ignore")
+                for train, test in cv.split(features, target, groups):
+                    estimator = clone(sklearn_pipeline)
+                    X_train, y_train = _safe_split(estimator, features, target, train)
+                    X_test, y_test = _safe_split(estimator, features, target, test, train)
+                    fit_params = self._fit_params(estimator, sample_weight, train)
+
+                    fit_start = time.time()
+                    with fold(features, train):
+                        estimator.fit(X_train, y_train, **fit_params)
+                    score_start = time.time()
+                    scores.append(scorer(estimator, X_test, y_test))
+                    score_end = time.time()
+
+                    record["fit_time"].append(round(score_start - fit_start, 4))
+                    record["score_time"].append(round(score_end - score_start, 4))
+            return float(np.nanmean(scores))
+        except TimeoutException:
+            raise
+        except MemoryError:
+            record["status"] = "memory"
+            record["error"] = f"MemoryError: exceeded [{self.memory_limit_mb}] MB"
+            return -float("inf")
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"[:200]
+            return -float("inf")
+
+    @staticmethod
+    def _fit_params(estimator, sample_weight, train):
+        if sample_weight is None:
+            return {}
+        from tpot.operator_utils import set_sample_weight
+        sample_weight_dict = set_sample_weight(estimator.steps, sample_weight) or {}
+        return {key: np.asarray(value)[train] for key, value in sample_weight_dict.items()}
+
+    def write(self, record):
+        if self.log_path is None:
+            return
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        # A single O_APPEND write keeps lines from parallel workers intact
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def reset(self):
+        if self.log_path is not None and os.path.isfile(self.log_path):
+            os.remove(self.log_path)
+
+    @contextmanager
+    def installed(self):
+        """
+        Replace TPOT's cross-validation scorer by this evaluator for the duration of the block.
+        """
+        import tpot.base
+        original = tpot.base._wrapped_cross_val_score
+        tpot.base._wrapped_cross_val_score = self
+        try:
+            yield self
+        finally:
+            tpot.base._wrapped_cross_val_score = original
+
+    def read(self):
+        if self.log_path is None or not os.path.isfile(self.log_path):
+            return []
+        with open(self.log_path) as log:
+            return [json.loads(line) for line in log if line.strip()]
+
+    def summarize(self):
+        """
+        Time budget consumed per operator. The wall time of a candidate is attributed to
+        every operator it contains, so the totals of a row show how much search time went
+        into pipelines using that operator.
+        """
+        rows = []
+        for record in self.read():
+            for operator in set(record["operators"]):
+                rows.append({
+                    "operator": operator,
+                    "time": record["time"],
+                    "fit_time": sum(record["fit_time"]),
+                    "timeout": record["status"] == "timeout",
+                    "error": record["status"] == "error",
+                    "memory": record["status"] == "memory",
+                    "score": record["score"],
+                })
+        if not rows:
+            return pd.DataFrame(columns=[
+                "operator", "evaluations", "total_time", "mean_time", "max_time",
+                "mean_fit_time", "timeouts", "errors", "memory_limit", "best_score"])
+
+        summary = pd.DataFrame(rows).groupby("operator").agg(
+            evaluations=("time", "size"),
+            total_time=("time", "sum"),
+            mean_time=("time", "mean"),
+            max_time=("time", "max"),
+            mean_fit_time=("fit_time", "mean"),
+            timeouts=("timeout", "sum"),
+            errors=("error", "sum"),
+            memory_limit=("memory", "sum"),
+            best_score=("score", "max"),
+        )
+        return summary.sort_values("total_time", ascending=False).round(4).reset_index()
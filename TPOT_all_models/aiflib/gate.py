@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+from aiflib.compaction import model_size_mb
+from aiflib.config import Config
+from aiflib.logger import Logger
+
+
+def serving_cost(model, X, request_rows=1, requests=50):
+    """
+    Serving cost of a fitted model on the sample X: p50 / p99 latency of requests of
+    request_rows rows, throughput predicting all of X at once and pickled size.
+    Predictions go through predict_proba where the model has it, as in Model.predict.
+    """
+    predict = getattr(model, "predict_proba", model.predict)
+    # Warm up caches and lazily loaded steps
+    predict(X[:request_rows])
+
+    latencies = []
+    for request in range(requests):
+        start = (request * request_rows) % max(1, X.shape[0] - request_rows + 1)
+        begin = time.perf_counter()
+        predict(X[start:start + request_rows])
+        latencies.append(time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    predict(X)
+    elapsed = time.perf_counter() - begin
+
+    return {
+        "latency_ms_p50": 1000. * float(np.percentile(latencies, 50)),
+        "latency_ms_p99": 1000. * float(np.percentile(latencies, 99)),
+        "throughput_rows_per_second": X.shape[0] / max(elapsed, 1e-9),
+        "size_mb": model_size_mb(model),
+    }
+
+
+class PerformanceGate:
+    """
+    Decides whether a newly trained model may replace the deployed one, from its serving
+    cost on a fixed sample: p99 request latency, throughput and size against the absolute
+    budgets (gate_max_latency_ms, gate_min_throughput, gate_max_size_mb) and against the
+    previous model, which it may not be worse than by more than gate_max_regression times.
+    """
+    def __init__(self):
+        self.config = Config()
+        self.logger = Logger(__name__)
+
+    def measure(self, model, X):
+        return serving_cost(model, X[:self.config.gate_sample_rows], self.config.gate_request_rows)
+
+    def violations(self, cost, previous_cost=None):
+        config = self.config
+        violations = []
+        if config.gate_max_latency_ms is not None and cost["latency_ms_p99"] > config.gate_max_latency_ms:
+            violations.append(f"p99 latency {cost['latency_ms_p99']:.2f} ms exceeds the budget of {config.gate_max_latency_ms} ms")
+        if config.gate_min_throughput is not None and cost["throughput_rows_per_second"] < config.gate_min_throughput:
+            violations.append(f"throughput {cost['throughput_rows_per_second']:.0f} rows/s is below the budget of "
+                              f"{config.gate_min_throughput} rows/s")
+        if config.gate_max_size_mb is not None and cost["size_mb"] > config.gate_max_size_mb:
+            violations.append(f"size {cost['size_mb']:.1f} MB exceeds the budget of {config.gate_max_size_mb} MB")
+
+        if previous_cost is not None:
+            ratio = config.gate_max_regression
+            for name, higher_is_worse in [("latency_ms_p99", True), ("throughput_rows_per_second", False), ("size_mb", True)]:
+                new, old = cost[name], previous_cost[name]
+                if old <= 0:
+                    continue
+                regression = new / old if higher_is_worse else old / max(new, 1e-9)
+                if regression > ratio:
+                    violations.append(f"{name} {new:.2f} is {regression:.1f}x worse than the previous model ({old:.2f}), "
+                                      f"more than the allowed {ratio}x")
+        return violations
+
+    def check(self, model, X, previous_cost=None):
+        """
+        Report of the serving cost of model on X and the budgets it violates.
+        """
+        cost = self.measure(model, X)
+        violations = self.violations(cost, previous_cost)
+        report = {
+            "mode": self.config.gate,
+            "cost": cost,
+            "previous_cost": previous_cost,
+            "violations": violations,
+            "promoted": not violations or self.config.gate != "enforce",
+        }
+        for violation in violations:
+            self.logger.info(f"Performance gate: {violation}")
+        self.logger.info(f"Performance gate: p99 latency [{cost['latency_ms_p99']:.2f}] ms for "
+                         f"[{self.config.gate_request_rows}] rows, throughput "
+                         f"[{cost['throughput_rows_per_second']:.0f}] rows/s, size [{cost['size_mb']:.1f}] MB, "
+                         f"{'promoted' if report['promoted'] else 'not promoted'}")
+        return report
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from aiflib.resources import available_cpus
+
+
+class StreamingImputer(BaseEstimator, TransformerMixin):
+    """
+    Mean imputation of missing values on a float32 matrix.
+
+    The column means are computed in a single pass over chunks of rows, and missing values
+    are filled chunk by chunk in place, both spread over threads (numpy releases the GIL).
+    Unlike SimpleImputer, columns without any observed value are kept and filled with 0,
+    so the number of columns never changes.
+
+    With copy=False a float32 C-contiguous input is imputed in place, any other input is
+    converted to such a matrix once.
+    """
+    def __init__(self, chunk_size=65536, n_threads=None, copy=True):
+        self.chunk_size = chunk_size
+        self.n_threads = n_threads
+        self.copy = copy
+
+    def _chunks(self, n_rows):
+        return [slice(start, min(start + self.chunk_size, n_rows)) for start in range(0, n_rows, self.chunk_size)]
+
+    def _map(self, function, chunks):
+        n_threads = self.n_threads or available_cpus()
+        if n_threads == 1 or len(chunks) == 1:
+            return [function(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return list(executor.map(function, chunks))
+
+    @staticmethod
+    def _as_float32(X, copy):
+        if copy:
+            return np.array(X, dtype=np.float32, order="C")
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def fit(self, X, y=None):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
+        def column_sums(chunk):
+            block = X[chunk]
+            missing = np.isnan(block)
+            return np.where(missing, 0, block).sum(axis=0, dtype=np.float64), (~missing).sum(axis=0)
+
+        partial_sums = self._map(column_sums, self._chunks(X.shape[0]))
+        sums = np.sum([partial[0] for partial in partial_sums], axis=0)
+        counts = np.sum([partial[1] for partial in partial_sums], axis=0)
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), 0.)
+        self.statistics_ = means.astype(np.float32)
+        return self
+
+    def transform(self, X):
+        return self._impute(self._as_float32(X, self.copy))
+
+    def fit_transform(self, X, y=None):
+        X = self._as_float32(X, self.copy)
+        return self.fit(X)._impute(X)
+
+    def _impute(self, X):
+        if X.shape[1] != self.statistics_.shape[0]:
+            raise ValueError(f"X has {X.shape[1]} features, the imputer was fitted on {self.statistics_.shape[0]}")
+
+        def fill(chunk):
+            block = X[chunk]
+            np.copyto(block, self.statistics_, where=np.isnan(block))
+
+        self._map(fill, self._chunks(X.shape[0]))
+        return X
@@ -0,0 +1,64 @@
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from aiflib.logger import Logger
+
+# Final estimators updated through partial_fit
+_PARTIAL_FIT_ESTIMATORS = ["SGDClassifier", "BernoulliNB", "GaussianNB", "MultinomialNB"]
+# Final estimators grown by fitting additional trees with warm_start
+_WARM_START_ESTIMATORS = ["ExtraTreesClassifier", "RandomForestClassifier"]
+
+
+def split_pipeline(model):
+    """
+    Fitted transformers applied before the final estimator of a (nested) pipeline, and
+    the final estimator.
+    """
+    transformers = []
+    while isinstance(model, Pipeline):
+        transformers += [step for _, step in model.steps[:-1] if step is not None and step != "passthrough"]
+        model = model.steps[-1][1]
+    return transformers, model
+
+
+def supports_incremental(model):
+    _, estimator = split_pipeline(model)
+    return type(estimator).__name__ in _PARTIAL_FIT_ESTIMATORS + _WARM_START_ESTIMATORS
+
+
+def incremental_update(model, X, y, trained_rows):
+    """
+    Update a fitted pipeline in place with new rows only: the transformers keep their
+    fitted state, the final estimator is updated through partial_fit or grown with new
+    trees fitted on the new rows, in proportion to the rows it was already trained on.
+    Returns False, leaving the model untouched, if the pipeline can't be updated.
+    """
+    logger = Logger(__name__)
+    transformers, estimator = split_pipeline(model)
+    name = type(estimator).__name__
+    if name not in _PARTIAL_FIT_ESTIMATORS + _WARM_START_ESTIMATORS:
+        logger.info(f"Final estimator [{name}] can't be updated incrementally.")
+        return False
+
+    unseen = set(np.unique(y)) - set(estimator.classes_)
+    if unseen:
+        logger.info(f"New data contains classes {sorted(unseen)} the model was not trained on.")
+        return False
+    if name in _WARM_START_ESTIMATORS and len(np.unique(y)) != len(estimator.classes_):
+        # Added trees must predict the same classes as the existing ones
+        logger.info(f"New data must contain every class to add trees to [{name}].")
+        return False
+
+    for transformer in transformers:
+        X = transformer.transform(X)
+
+    if name in _PARTIAL_FIT_ESTIMATORS:
+        estimator.partial_fit(X, y)
+        logger.info(f"Updated [{name}] with partial_fit on [{len(y)}] new rows.")
+    else:
+        n_trees = max(1, int(round(estimator.n_estimators * len(y) / max(1, trained_rows))))
+        estimator.set_params(warm_start = True, n_estimators = estimator.n_estimators + n_trees)
+        estimator.fit(X, y)
+        estimator.set_params(warm_start = False)
+        logger.info(f"Added [{n_trees}] trees to [{name}] fitted on [{len(y)}] new rows.")
+    return True
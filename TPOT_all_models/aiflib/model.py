@@ -1,15 +1,29 @@
 import os
+import glob
+import shutil
+import json
 import joblib
 import numpy as np
 import pandas as pd
-from tpot import TPOTClassifier 
 from collections import defaultdict
+from scipy.sparse import csr_matrix
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from aiflib.data_manager import DataManager
+from aiflib.artifact import LazyPipeline, save_artifact
+from aiflib.binning import PREBINNED, prebin, remove_prebinned
+from aiflib.compaction import compact_model
+from aiflib.checkpoint import SearchCheckpoint, atomic_dump
 from aiflib.config import Config
+from aiflib.engines import EngineScheduler, create_engines
+from aiflib.evaluation import holdout_metrics
+from aiflib.gate import PerformanceGate
+from aiflib.imputation import StreamingImputer
+from aiflib.incremental import incremental_update
+from aiflib.profiling import profiler, stage, timed
+from aiflib.search import SearchClassifier, PlateauStopper, select_by_serving_cost
+from aiflib.serving_metrics import serving_metrics
 from aiflib.logger import Logger, UiPathUsageException
 
 # Constants
@@ -30,12 +44,20 @@ Documentation for a detailed explanation and other configuration parameters.
 """
 
 class Model():
+    # Parsed evaluation data of this process, keyed by the checksum of its files
+    _evaluation_cache = {}
+
     def __init__(self, is_infer_only = False):
         self.config = Config()
         self.logger = Logger(__name__)
+        self._model_mtime = None
+        self._saved_pipeline = None
+        self._feature_names = None
+        self.training_hash = None
         self._model = self.load_model()
         self._label_encoder = self.load_labelencoder()
 
+    @stage("train")
     def train(self, directory):
 
         dm = DataManager(directory)
@@ -46,39 +68,218 @@ class Model():
         data_df = dm.get_data()
         X = data_df[dm.get_feature_columns()].values
         y = data_df[dm.get_target_column()].values
+        self._feature_names = dm.get_feature_columns()
 
         help_string = "Warning: You have retrained a model which was generated by a TPOT optimization pipeline.\
         \nFor optimal results please run the TPOT optimization pipeline from scratch by training package version [1.0]."
 
-        if not self.is_trained() or self.config.warm_start == True:
-            self._model = self.build_model(X, y)
+        # Rows held out of the training to prune the trained ensemble on, so that the
+        # evaluation data stays unseen by the pruning
+        validation = self.pruning_validation(y)
+        fitted = np.ones(len(y), dtype = bool) if validation is None else ~validation
+        X_fit, y_fit = X[fitted], y[fitted]
+
+        # A left over checkpoint of a search on the same training data means that search
+        # was interrupted, resume it; checkpoints of other training data are removed
+        self.training_hash = joblib.hash((X_fit, y_fit))
+        resume = self.config.resume and SearchCheckpoint.remove_stale(self.checkpoint_path(), self.training_hash)
+
+        trained_files = DataManager.file_checksums(directory)
+        if isinstance(self._model, LazyPipeline):
+            self._model = self._model.to_pipeline()
+
+        # Serving cost of the deployed model, measured before training changes it
+        gate = PerformanceGate() if self.config.gate != "off" else None
+        previous_model, previous_cost = self._model, None
+        if gate is not None:
+            gate_sample = self.gate_sample(X)
+            if self.is_trained():
+                try:
+                    previous_cost = gate.measure(self._model, gate_sample)
+                except Exception as e:
+                    self.logger.info(f"Could not measure the previous model on the new data, only the budgets apply: {e}")
+
+        if not self.is_trained() or self.config.warm_start == True or resume:
+            if self.config.sparse:
+                self._model = self.build_model(X_fit, y_fit, sparse_encoder = dm.get_sparse_encoder())
+            else:
+                self._model = self.build_model(X_fit, y_fit, id_encoder = dm.get_id_encoder())
+        elif self.config.incremental and self.incremental_fit(directory, dm, X, y, trained_files, fitted):
+            self.logger.info(f"Finished updating model.")
         else:
-            self._model.fit(X, y)
+            self._model.fit(X_fit, y_fit)
             self.logger.info(f"Finished retraining model.")
             self.logger.info(help_string)
-            
-        joblib.dump(self._model, os.path.join(self.config.cur_dir, "model", "Model.sav"))
+
+        if self.config.compact_model:
+            self.compact(X, None if validation is None else (X[validation], y[validation]))
+
+        if gate is not None:
+            report = gate.check(self._model, gate_sample, previous_cost)
+            with open(os.path.join(self.config.artifacts_directory, "performance_gate.json"), "w") as report_file:
+                json.dump(report, report_file)
+            if not report["promoted"]:
+                self.restore_model(previous_model)
+                raise UiPathUsageException(
+                    "The trained model was not saved as it exceeds its serving budgets: " + "; ".join(report["violations"]))
+
+        self.save_model(self._model)
+        with open(self.trained_files_path(), "w") as trained_files_file:
+            json.dump({"files": trained_files, "rows": len(y)}, trained_files_file)
+
+    def gate_sample(self, X):
+        """
+        Rows the performance gate measures the models on: the evaluation data if there is
+        any, so that successive models are measured on the same rows, else the training data.
+        """
+        evaluation_data = self.load_evaluation_data(self.config.test_data_directory)
+        return X if evaluation_data is None else evaluation_data[0]
+
+    def restore_model(self, previous_model):
+        """
+        Keep serving the model deployed before a train which the performance gate refused.
+        """
+        if previous_model is None:
+            # First train: checkpoints or snapshots of the search may have saved ungated models
+            self.remove_model()
+            self._model = None
+        elif previous_model is not self._model:
+            self._model = previous_model
+            if self.config.checkpoint_interval_mins > 0 or self.config.snapshot_best:
+                # Checkpoints and snapshots of the search replace Model.sav with their best pipeline
+                self.save_model(previous_model)
+        else:
+            # Retrained or updated in place without a search, Model.sav still holds the previous model
+            self._model = self.load_model()
+
+    def remove_model(self):
+        """
+        Remove the saved model and the snapshot of the search.
+        """
+        if os.path.isdir(self.artifact_path()):
+            shutil.rmtree(self.artifact_path())
+        for path in [os.path.join(self.config.cur_dir, "model", "Model.sav"),
+                     os.path.join(self.config.cur_dir, "model", "snapshot.json")]:
+            if os.path.isfile(path):
+                os.remove(path)
+        self._model_mtime = None
+
+    def incremental_fit(self, directory, dm, X, y, trained_files, fitted):
+        """
+        Update the model with the rows of the training files which were added since the
+        last train, among the fitted ones. Returns False if the model has to be refitted on
+        all the data instead.
+        """
+        if not os.path.isfile(self.trained_files_path()):
+            self.logger.info("No record of the files the model was trained on, retraining on all the data.")
+            return False
+        with open(self.trained_files_path()) as trained_files_file:
+            previous = json.load(trained_files_file)
+
+        changed = [name for name, checksum in previous["files"].items() if trained_files.get(name) != checksum]
+        if changed:
+            self.logger.info(f"Files {changed} changed or were removed since the last train, retraining on all the data.")
+            return False
+
+        new_files = [name for name in trained_files if name not in previous["files"]]
+        if not new_files:
+            self.logger.info("No new training files since the last train, keeping the model.")
+            return True
+
+        new_rows = dm.rows_from([os.path.join(directory, name) for name in new_files]) & fitted
+        self.logger.info(f"Updating model with [{new_rows.sum()}] rows from new files {new_files}")
+        return incremental_update(self._model, X[new_rows], y[new_rows], previous["rows"])
     
 
-    def evaluate(self, evaluation_directory):
+    def pruning_validation(self, y):
+        """
+        Boolean mask of the training rows held out to prune the trained ensemble on, None
+        unless pruning is enabled.
+        """
+        if not self.config.compact_model or self.config.prune_max_loss is None:
+            return None
+        rows = np.arange(len(y))
+        can_stratify = (self.config.prune_validation * len(y)) > len(np.unique(y))
+        _, validation_rows = train_test_split(
+            rows,
+            test_size = self.config.prune_validation,
+            random_state = self.config.seed,
+            stratify = y if can_stratify else None)
+        validation = np.zeros(len(y), dtype = bool)
+        validation[validation_rows] = True
+        self.logger.info(f"Holding out [{len(validation_rows)}] training rows to prune the trained model on")
+        return validation
+
+    @timed("model.compact")
+    def compact(self, X, validation_data = None):
+        """
+        Shrink the tree ensembles of the trained model, pruning within prune_max_loss of
+        the accuracy and prune_max_log_loss of the log loss on the validation data, rows
+        of the training data the model was not fitted on.
+        """
+        if validation_data is None:
+            X, y = X[:1000], None
+        else:
+            X, y = validation_data
 
-        dm = DataManager(evaluation_directory)
-        data_df = dm.get_data()
+        report = compact_model(
+            self._model, X, y, self.config.prune_max_loss,
+            max_log_loss = self.config.prune_max_log_loss,
+            min_estimators = self.config.prune_min_estimators)
+        with open(os.path.join(self.config.artifacts_directory, "compaction_report.json"), "w") as report_file:
+            json.dump(report, report_file)
 
-        if not dm.validate(for_train = False):
-            self.logger.info("No valid test data to run this evaluation pipeline.")
+    @stage("evaluate")
+    def evaluate(self, evaluation_directory):
 
-        data_df = dm.get_data()
-        X = data_df[dm.get_feature_columns()].values
-        y = data_df[dm.get_target_column()].values
+        evaluation_data = self.load_evaluation_data(evaluation_directory)
+        if evaluation_data is None:
+            self.logger.info("No valid test data to run this evaluation pipeline.")
+            return None
+        X, y = evaluation_data
 
         if not self.is_trained():
             self.logger.info(_UNTRAINED_HELP)
         else:
-            score = self._model.score(X, y)
+            metrics = holdout_metrics(self._model, X, y)
+            with open(os.path.join(self.config.artifacts_directory, "evaluation_metrics.json"), "w") as metrics_file:
+                json.dump(metrics, metrics_file)
+            self.logger.info(f"Evaluation metrics = {metrics}")
+            score = metrics["accuracy"]
             self.logger.info(f"Evaluation score = {score}")
             return score
 
+    def load_evaluation_data(self, evaluation_directory):
+        """
+        Parsed evaluation matrix and labels, cached in memory and in artifacts_directory
+        under the checksum of the evaluation files so that repeated evaluations skip the
+        csv parsing.
+        """
+        key = DataManager.data_checksum(evaluation_directory)
+        if key in Model._evaluation_cache:
+            return Model._evaluation_cache[key]
+
+        cache_path = os.path.join(self.config.artifacts_directory, f"evaluation_{key}.npz")
+        if os.path.isfile(cache_path):
+            self.logger.info(f"Loading cached evaluation data from {cache_path}")
+            with np.load(cache_path, allow_pickle = True) as cached:
+                evaluation_data = (cached["X"], cached["y"])
+        else:
+            dm = DataManager(evaluation_directory)
+            if not dm.validate(for_train = False):
+                return None
+            data_df = dm.get_data()
+            evaluation_data = (data_df[dm.get_feature_columns()].values, data_df[dm.get_target_column()].values)
+
+            # Only keep the cache of the latest evaluation data
+            for stale_path in glob.glob(os.path.join(self.config.artifacts_directory, "evaluation_*.npz")):
+                os.remove(stale_path)
+            np.savez(cache_path, X = evaluation_data[0], y = evaluation_data[1])
+
+        Model._evaluation_cache = {key: evaluation_data}
+        return evaluation_data
+
+    @stage("process_data")
     def process_data(self, directory):
 
         if not self.config.test_data_from_ui:
@@ -120,12 +321,93 @@ class Model():
             self.logger.info("Did not split data into train and test sets. Model will be evaluated on data selected from UI.")
 
 
-    def build_model(self, X, y):
-        # Perform missing value imputation as scikit-learn models can't handle NaN's
-        nan_imputer = SimpleImputer(missing_values=np.nan, strategy="mean")
+    @timed("model.build_model")
+    def build_model(self, X, y, id_encoder = None, sparse_encoder = None):
+        X_raw = X
+        with profiler().timer("model.build_model.preprocess"):
+            X, preprocessing = self.preprocess(X, id_encoder, sparse_encoder)
+        return Pipeline(preprocessing + [self.search(X, y, X_raw, preprocessing)])
+
+    def preprocess(self, X, id_encoder = None, sparse_encoder = None):
+        """
+        Fit the preprocessing shared by all search engines on the raw feature matrix X.
+        Returns the preprocessed X and the fitted (name, step) pipeline steps.
+        """
+        if sparse_encoder is not None:
+            # One-hot encode the categorical columns to a sparse matrix, imputing the others
+            return sparse_encoder.transform(X), [("sparse_encoder", sparse_encoder)]
+
+        # Encode identifier columns, converting the data to float32
+        X = id_encoder.transform(X) if id_encoder is not None else X.astype(np.float32)
+
+        # Perform missing value imputation as scikit-learn models can't handle NaN's,
+        # in place on the float32 training matrix only: the served imputer copies its input
+        nan_imputer = StreamingImputer(copy = False)
         X = nan_imputer.fit_transform(X)
+        nan_imputer.set_params(copy = True)
+
+        if self.config.prebin and self.config.operators == "all" and PREBINNED:
+            with profiler().timer("model.build_model.prebin"):
+                prebin(X, self.config.artifacts_directory, self.config.seed)
+        return X, [("id_encoder", id_encoder or "passthrough"), ("nan_imputer", nan_imputer)]
+
+    def search(self, X, y, X_raw, preprocessing):
+        """
+        Search the pipeline for the preprocessed X with the engines of the engines parameter
+        (see aiflib.engines) and return the best one fitted, as the (name, estimator) final
+        step of the model.
+        """
+        engines = create_engines(self.config.engines, self, preprocessing, X_raw)
+        scheduler = EngineScheduler(
+            engines, self.config.max_time_mins, self.config.engine_schedule, self.config.engine_holdout)
+        try:
+            engine = scheduler.run(X, y)
+        finally:
+            remove_prebinned(self.config.artifacts_directory)
+
+        # The final model replaces the snapshots of the running search
+        snapshot_path = os.path.join(self.config.cur_dir, "model", "snapshot.json")
+        if os.path.isfile(snapshot_path):
+            os.remove(snapshot_path)
+
+        engine.export(self.config.artifacts_directory)
+        return (engine.step_name, engine.fitted_)
+
+    def select_pipeline(self, pipeline_optimizer, preprocessing, X, y, X_raw):
+        """
+        Replace the best pipeline of the search by the best one within the serving budgets,
+        measured on the rows the performance gate uses.
+        """
+        individual, fitted_pipeline, score, report = select_by_serving_cost(
+            pipeline_optimizer, preprocessing, X, y,
+            self.gate_sample(X_raw)[:self.config.gate_sample_rows],
+            candidates = self.config.selection_candidates,
+            latency_budget_ms = self.config.latency_budget_ms,
+            size_budget_mb = self.config.size_budget_mb,
+            tolerance = self.config.selection_tolerance,
+            request_rows = self.config.gate_request_rows)
+        pipeline_optimizer._optimized_pipeline = individual
+        pipeline_optimizer._optimized_pipeline_score = score
+        pipeline_optimizer.fitted_pipeline_ = fitted_pipeline
+        with open(os.path.join(self.config.artifacts_directory, "selection_report.json"), "w") as report_file:
+            json.dump(report, report_file)
+
+    def create_optimizer(self, governor, plan, state = None, max_time_mins = None):
+        if max_time_mins is None:
+            max_time_mins = self.config.max_time_mins
+        if state is not None:
+            # Only the remainder of the time budget is left when resuming
+            max_time_mins = max(1, max_time_mins - state["elapsed_mins"])
+        template = None
+        if self.config.sparse:
+            config_dict = self.config.sparse_classifier_config_dict
+            template = self.config.sparse_template
+        elif self.config.operators == "xgboost":
+            config_dict = self.config.xgboost_classifier_config_dict
+        else:
+            config_dict = self.config.classifier_config_dict
 
-        pipeline_optimizer = TPOTClassifier(
+        pipeline_optimizer = SearchClassifier(
             generations = self.config.generations, 
             population_size = self.config.population_size,
             offspring_size = self.config.offspring_size,
@@ -133,72 +415,177 @@ class Model():
             crossover_rate = self.config.crossover_rate,
             scoring = self.config.scoring, 
             cv = self.config.cv,
-            subsample = self.config.subsample, 
-            n_jobs = -1,
-            max_time_mins = self.config.max_time_mins, 
+            subsample = self.config.subsample if self.config.subsample_strategy == "uniform" else 1.0, 
+            n_jobs = plan.n_jobs,
+            max_time_mins = max_time_mins, 
             max_eval_time_mins = self.config.max_eval_time_mins,
             random_state = self.config.seed, 
-            config_dict = self.config.classifier_config_dict,
+            config_dict = governor.apply_to_config_dict(config_dict, plan),
+            template = template,
             warm_start = self.config.warm_start,
             memory = self.config.artifacts_directory,
             verbosity = 1
             )
-        
-        # Fit TPOT to data
-        pipeline_optimizer.fit(X, y)
-        self.logger.info(f"Finished running TPOT optimization pipeline.")
-
-        # Export fitted pipeline to artifacts directory
-        pipeline_path = os.path.join(self.config.artifacts_directory, "TPOT_pipeline.py")
-        pipeline_optimizer.export(pipeline_path)
-        self.logger.info(f"Saving best pipeline to {pipeline_path}")
-
-        # Create new pipeline which contains nan_imputer
-        pipe = Pipeline(
-            [
-                ("nan_imputer", nan_imputer),
-                ("tpot_pipeline", pipeline_optimizer.fitted_pipeline_),
-            ]
-        )
-        return pipe
 
+        # Stop the search once the best CV score plateaus
+        callbacks = []
+        if self.config.early_stop is not None or self.config.early_stop_mins is not None:
+            callbacks.append(PlateauStopper(
+                min_delta = self.config.early_stop_delta,
+                generations = self.config.early_stop,
+                minutes = self.config.early_stop_mins,
+                max_time_mins = max_time_mins))
+        pipeline_optimizer.generation_callbacks = callbacks
+        pipeline_optimizer.resume_state = state
+        return pipeline_optimizer
+
+    def save_best_pipeline(self, pipeline_optimizer, preprocessing, X, y, subsample = 1.0):
+        """
+        Fit the best pipeline found so far on the preprocessed X, on a stratified subsample
+        of the rows if subsample < 1, and save it with the fitted preprocessing steps as
+        Model.sav along with a description in snapshot.json.
+        """
+        pipeline_string = str(pipeline_optimizer._optimized_pipeline)
+        if pipeline_string == self._saved_pipeline:
+            return
+
+        if subsample < 1.0:
+            can_stratify = (subsample * len(y)) > len(np.unique(y))
+            X, _, y, _ = train_test_split(
+                X, y,
+                train_size = subsample,
+                random_state = self.config.seed,
+                stratify = y if can_stratify else None)
+
+        best_pipeline = pipeline_optimizer._toolbox.compile(expr = pipeline_optimizer._optimized_pipeline)
+        best_pipeline.fit(X, y)
+        self.save_model(Pipeline(
+            preprocessing + [
+                ("tpot_pipeline", best_pipeline),
+            ]
+        ))
+        self._saved_pipeline = pipeline_string
+
+        snapshot = {
+            "pipeline": pipeline_string,
+            "cv_score": pipeline_optimizer._optimized_pipeline_score,
+            "fitted_rows": len(y),
+            "saved_at": pd.Timestamp.now().isoformat(),
+        }
+        with open(os.path.join(self.config.cur_dir, "model", "snapshot.json"), "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        self.logger.info(f"Saved best pipeline so far with CV score [{snapshot['cv_score']}] fitted on [{len(y)}] rows")
+
+    def log_telemetry(self, evaluator):
+        summary = evaluator.summarize()
+        summary_path = os.path.join(self.config.artifacts_directory, "evaluations_summary.csv")
+        summary.to_csv(summary_path, index=False)
+        self.logger.info(f"Evaluated pipelines logged to {evaluator.log_path}")
+        self.logger.info(f"Search time per operator:\n{summary.to_string(index=False)}")
+
+    @timed("model.predict")
     def predict(self, mlskill_input):
-        
+
+        if self.config.hot_reload:
+            self.reload_if_updated()
+
         if self._model is None:
             return { 'error': _UNTRAINED_HELP }
 
-        data = pd.read_json(mlskill_input)
-        data_dict = defaultdict(list)
-        
-        # Not all scikit-learn models support the predict_proba function:
-        try:
-            prediction_tuples = self._model.predict_proba(data.values)
-            for prediction_tuple in prediction_tuples:
-                prediction = np.argmax(prediction_tuple)
-                confidence = prediction_tuple[prediction]
-                data_dict['predictions'].append(prediction)
-                data_dict['confidences'].append(confidence)
-                if self._label_encoder is not None:
-                    label = self._label_encoder.inverse_transform([prediction])[0]
-                    data_dict['labels'].append(label)    
-            return_df = pd.DataFrame.from_dict(data_dict)
-            return return_df.to_json(orient = 'records')
-        except:
-            predictions = self._model.predict(data.values)
-            data_dict['predictions'] = predictions
-            if self._label_encoder is not None:
-                labels = self._label_encoder.inverse_transform(predictions)
-                data_dict['labels'] = labels          
-            return_df = pd.DataFrame.from_dict(data_dict)
-            return return_df.to_json(orient = 'records')
+        with serving_metrics().request() as request:
+            with request.phase("decode"):
+                features = self.read_features(mlskill_input)
+            request.rows = features.shape[0]
+            profiler().count("predict.rows", features.shape[0])
+
+            # Not all scikit-learn models support the predict_proba function:
+            with request.phase("pipeline"):
+                try:
+                    prediction_tuples = self._model.predict_proba(features)
+                except:
+                    prediction_tuples = None
+                    predictions = self._model.predict(features)
+
+            with request.phase("encode"):
+                data_dict = defaultdict(list)
+                if prediction_tuples is not None:
+                    for prediction_tuple in prediction_tuples:
+                        prediction = np.argmax(prediction_tuple)
+                        confidence = prediction_tuple[prediction]
+                        data_dict['predictions'].append(prediction)
+                        data_dict['confidences'].append(confidence)
+                        if self._label_encoder is not None:
+                            label = self._label_encoder.inverse_transform([prediction])[0]
+                            data_dict['labels'].append(label)
+                else:
+                    data_dict['predictions'] = predictions
+                    if self._label_encoder is not None:
+                        labels = self._label_encoder.inverse_transform(predictions)
+                        data_dict['labels'] = labels
+                return_df = pd.DataFrame.from_dict(data_dict)
+                return return_df.to_json(orient = 'records')
+
+    def serving_metrics(self):
+        """
+        Latency percentiles of the predict phases, rows per request and errors of this process.
+        """
+        return serving_metrics().snapshot()
+
+    def read_features(self, mlskill_input):
+        """
+        Feature matrix of a request: records as read by pandas, or an already encoded CSR
+        matrix {"data": [...], "indices": [...], "indptr": [...], "shape": [rows, columns]}
+        for models trained with sparse set.
+        """
+        if isinstance(mlskill_input, str) and mlskill_input.lstrip().startswith("{"):
+            payload = json.loads(mlskill_input)
+            # Only an object with exactly the CSR keys is a sparse matrix; a column-oriented
+            # record whose feature happens to be called "indptr" is still read by pandas
+            if isinstance(payload, dict) and set(payload) == {"data", "indices", "indptr", "shape"}:
+                return csr_matrix(
+                    (payload["data"], payload["indices"], payload["indptr"]), shape = payload["shape"], dtype = np.float32)
+        return pd.read_json(mlskill_input).values
+
+    @timed("model.save_model")
+    def save_model(self, model):
+        if self.config.artifact_format == "compact":
+            manifest = save_artifact(model, self.artifact_path(), self._feature_names)
+            size_mb = sum(step["bytes"] for step in manifest["steps"]) / 2. ** 20
+            self.logger.info(f"Saved model artifact of [{len(manifest['steps'])}] steps, [{size_mb:.1f}] MB")
+        else:
+            atomic_dump(model, os.path.join(self.config.cur_dir, "model", "Model.sav"))
+
+    def model_path(self):
+        if self.config.artifact_format == "compact":
+            return os.path.join(self.artifact_path(), "manifest.json")
+        return os.path.join(self.config.cur_dir, "model", "Model.sav")
+
+    def artifact_path(self):
+        return os.path.join(self.config.cur_dir, "model", "artifact")
+
+    def trained_files_path(self):
+        return os.path.join(self.config.cur_dir, "model", "trained_files.json")
+
+    def checkpoint_path(self):
+        return os.path.join(self.config.artifacts_directory, "search_checkpoint.pkl")
 
     def load_model(self):
-        if os.path.isfile(os.path.join(self.config.cur_dir, "model", "Model.sav")):
+        if os.path.isfile(self.model_path()):
             self.logger.info(f"Loading pre-trained model...")
-            return joblib.load(os.path.join(self.config.cur_dir, "model", "Model.sav"))
+            self._model_mtime = os.path.getmtime(self.model_path())
+            if self.config.artifact_format == "compact":
+                return LazyPipeline(self.artifact_path())
+            return joblib.load(self.model_path())
         else:
             return None
 
+    def reload_if_updated(self):
+        # The model is replaced atomically, so a changed mtime means a complete new model
+        path = self.model_path()
+        if os.path.isfile(path) and os.path.getmtime(path) != self._model_mtime:
+            self._model = self.load_model()
+            self._label_encoder = self.load_labelencoder()
+
     def load_labelencoder(self):
         if os.path.isfile(os.path.join(self.config.cur_dir, "model", "LabelEncoder.sav")):
             self.logger.info(f"Loading label encoder...")
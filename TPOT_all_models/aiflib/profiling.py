@@ -0,0 +1,273 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from aiflib.config import Config
+from aiflib.logger import Logger, UiPathUsageException
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process so far, None where it is not available.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2. ** 20
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class _NullTimer:
+    """
+    Shared no-op timer handed out while profiling is disabled.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start, failed = exc_type is not None)
+        return False
+
+
+class Profiler:
+    """
+    Timers, counters and peak memory reported by the aiflib stages.
+
+    Stages time themselves with `with profiler().timer("model.train"):` or the @timed
+    decorator and count with profiler().count(name, value). Every timer records its number
+    of calls, failures, total / min / max seconds and the peak RSS of the process when it
+    finished. While profiling is disabled timers are a shared no-op and counts return at once.
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name, seconds, failed = False):
+        memory_mb = peak_rss_mb()
+        with self._lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                stats = self.timers[name] = {
+                    "count": 0, "failures": 0, "total_seconds": 0., "min_seconds": seconds, "max_seconds": seconds,
+                    "peak_rss_mb": memory_mb}
+            stats["count"] += 1
+            stats["failures"] += int(failed)
+            stats["total_seconds"] += seconds
+            stats["min_seconds"] = min(stats["min_seconds"], seconds)
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if memory_mb is not None:
+                stats["peak_rss_mb"] = max(stats["peak_rss_mb"] or 0., memory_mb)
+
+    def count(self, name, value = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.timers = {}
+            self.counters = {}
+
+    def snapshot(self):
+        current_mb, peak_mb = rss_mb(), peak_rss_mb()
+        if current_mb is not None and peak_mb is not None:
+            # Both are sampled from different counters, keep them consistent
+            peak_mb = max(current_mb, peak_mb)
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "uptime_seconds": time.time() - self.started_at,
+                "pid": os.getpid(),
+                "rss_mb": current_mb,
+                "peak_rss_mb": peak_mb,
+                "timers": {name: dict(stats) for name, stats in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent = 2, sort_keys = True)
+
+    def to_prometheus(self):
+        """
+        The statistics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP aiflib_stage_seconds Time spent in an aiflib stage.",
+            "# TYPE aiflib_stage_seconds summary",
+        ]
+        for name, stats in sorted(snapshot["timers"].items()):
+            lines.append(f'aiflib_stage_seconds_sum{{stage="{name}"}} {stats["total_seconds"]:.6f}')
+            lines.append(f'aiflib_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += ["# HELP aiflib_stage_failures_total Stages which raised.", "# TYPE aiflib_stage_failures_total counter"]
+        for name, stats in sorted(snapshot["timers"].items()):
+            lines.append(f'aiflib_stage_failures_total{{stage="{name}"}} {stats["failures"]}')
+        lines += ["# HELP aiflib_stage_max_seconds Slowest call of an aiflib stage.", "# TYPE aiflib_stage_max_seconds gauge"]
+        for name, stats in sorted(snapshot["timers"].items()):
+            lines.append(f'aiflib_stage_max_seconds{{stage="{name}"}} {stats["max_seconds"]:.6f}')
+        lines += ["# HELP aiflib_events_total Events counted by the aiflib stages.", "# TYPE aiflib_events_total counter"]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'aiflib_events_total{{name="{name}"}} {value}')
+        for metric, value in [("rss_bytes", snapshot["rss_mb"]), ("peak_rss_bytes", snapshot["peak_rss_mb"])]:
+            if value is not None:
+                lines += [f"# TYPE aiflib_{metric} gauge", f"aiflib_{metric} {int(value * 2 ** 20)}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory, profiling_format = "json"):
+        """
+        Write the statistics to directory/profile.json or directory/profile.prom, replacing
+        the previous export atomically. Returns the path written, None while disabled.
+        """
+        if not self.enabled:
+            return None
+        if profiling_format == "prometheus":
+            path, content = os.path.join(directory, "profile.prom"), self.to_prometheus()
+        else:
+            path, content = os.path.join(directory, "profile.json"), self.to_json()
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as profile_file:
+            profile_file.write(content)
+        os.replace(temporary_path, path)
+        return path
+
+
+_profiler = None
+
+
+def profiler():
+    """
+    The profiler of this process, enabled by the profiling parameter.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(Config().profiling)
+    return _profiler
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as the stage name.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            stage_profiler = profiler()
+            if not stage_profiler.enabled:
+                return function(*args, **kwargs)
+            with stage_profiler.timer(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Whether a capture is recording in this thread
+_capturing = threading.local()
+
+
+@contextmanager
+def capture(name):
+    """
+    Record a cProfile (profile_<name>.prof, for pstats / snakeviz) or pyinstrument
+    (profile_<name>.html) profile of the block to artifacts_directory, as set by the
+    profile_capture parameter. Nested captures only record the outermost block.
+    """
+    config = Config()
+    if config.profile_capture == "none" or getattr(_capturing, "active", False):
+        yield
+        return
+
+    logger = Logger(__name__)
+    _capturing.active = True
+    try:
+        if config.profile_capture == "cprofile":
+            import cProfile
+            capture_profiler = cProfile.Profile()
+            capture_profiler.enable()
+            try:
+                yield
+            finally:
+                capture_profiler.disable()
+                path = os.path.join(config.artifacts_directory, f"profile_{name}.prof")
+                capture_profiler.dump_stats(path)
+                logger.info(f"Saved cProfile of [{name}] to {path}")
+        else:
+            try:
+                from pyinstrument import Profiler as SamplingProfiler
+            except ImportError as e:
+                raise UiPathUsageException(f"profile_capture [pyinstrument] requires pyinstrument to be installed: {e}")
+            capture_profiler = SamplingProfiler()
+            capture_profiler.start()
+            try:
+                yield
+            finally:
+                capture_profiler.stop()
+                path = os.path.join(config.artifacts_directory, f"profile_{name}.html")
+                with open(path, "w") as profile_file:
+                    profile_file.write(capture_profiler.output_html())
+                logger.info(f"Saved pyinstrument profile of [{name}] to {path}")
+    finally:
+        _capturing.active = False
+
+
+
+def stage(name):
+    """
+    Decorator for the top-level Model stages (train, evaluate, process_data): captures the
+    stage if profile_capture is set, times it as model.<name> and exports the statistics
+    to artifacts_directory once it finished.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            stage_profiler = profiler()
+            try:
+                with capture(name), stage_profiler.timer(f"model.{name}"):
+                    return function(*args, **kwargs)
+            finally:
+                if stage_profiler.enabled:
+                    config = Config()
+                    path = stage_profiler.export(config.artifacts_directory, config.profiling_format)
+                    Logger(__name__).info(f"Saved profile of [{name}] to {path}")
+        return wrapper
+    return decorator
@@ -0,0 +1,211 @@
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from scipy import sparse
+
+from aiflib.config import Config
+from aiflib.logger import Logger
+
+# Outer (pipeline-level) vs. inner (estimator-level) parallelism decided for one search
+ResourcePlan = namedtuple("ResourcePlan", [
+    "n_jobs", "threads_per_job", "memory_per_eval_mb", "cpu_count", "available_memory_mb"
+])
+
+# Environment variables read by the BLAS / OpenMP runtimes when a worker process starts
+_THREAD_VARIABLES = [
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS",
+]
+
+# Estimators which parallelise internally through an n_jobs (or nthread) parameter
+_THREADED_ESTIMATORS = [
+    "sklearn.ensemble.ExtraTreesClassifier",
+    "sklearn.ensemble.RandomForestClassifier",
+    "sklearn.neighbors.KNeighborsClassifier",
+    "xgboost.XGBClassifier",
+]
+
+# Fixed memory footprint of a worker process (interpreter, numpy, scikit-learn, ...)
+_WORKER_OVERHEAD_MB = 256
+# A candidate holds the fold copies and at least one transformed copy of the data
+_DATA_COPIES_PER_EVAL = 4
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    # Respect a container CPU quota (cgroup v2, then v1)
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            limit, period = cpu_max.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (IOError, OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as quota_file, \
+                    open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as period_file:
+                limit = int(quota_file.read())
+                if limit > 0:
+                    quota = limit / int(period_file.read())
+        except (IOError, OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return cpus
+
+
+def available_memory_mb():
+    candidates = []
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) / 1024.)
+    except (IOError, OSError, ValueError):
+        pass
+
+    # Respect a container memory limit (cgroup v2, then v1)
+    for limit_path, usage_path in [
+            ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+            ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes")]:
+        try:
+            with open(limit_path) as limit_file, open(usage_path) as usage_file:
+                limit = limit_file.read().strip()
+                if limit != "max" and int(limit) < 2 ** 60:
+                    candidates.append((int(limit) - int(usage_file.read())) / 2. ** 20)
+            break
+        except (IOError, OSError, ValueError):
+            continue
+
+    return min(candidates) if candidates else None
+
+
+def data_nbytes(X):
+    if sparse.issparse(X):
+        X = X.tocsr()
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def _virtual_memory_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmSize:"):
+                return int(line.split()[1]) / 1024.
+    raise OSError("VmSize not found in /proc/self/status")
+
+
+@contextmanager
+def memory_limit(limit_mb):
+    """
+    Cap the memory this process may allocate on top of what it already uses to limit_mb
+    for the duration of the block; allocations beyond the cap raise MemoryError.
+    No-op where address space limits are not available.
+    """
+    limits = None
+    if limit_mb is not None and resource is not None:
+        try:
+            limits = resource.getrlimit(resource.RLIMIT_AS)
+            soft, hard = limits
+            limit = int((_virtual_memory_mb() + limit_mb) * 2 ** 20)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        except (OSError, ValueError):
+            limits = None
+    try:
+        yield
+    finally:
+        if limits is not None:
+            resource.setrlimit(resource.RLIMIT_AS, limits)
+
+
+class ResourceGovernor:
+    """
+    Decides how many pipelines TPOT evaluates concurrently and how many threads each of
+    them may use, so that the product never exceeds the cores available to the container
+    and the concurrent evaluations fit in memory.
+    """
+    def __init__(self):
+        self.config = Config()
+        self.logger = Logger(__name__)
+
+    def plan(self, X, cpus=None):
+        """
+        Plan of a search on X, on cpus of the available cores if given.
+        """
+        cpus = available_cpus() if cpus is None else min(cpus, available_cpus())
+        memory_mb = available_memory_mb()
+
+        n_jobs = cpus if self.config.n_jobs == -1 else min(self.config.n_jobs, cpus)
+        if self.config.threads_per_job is not None:
+            n_jobs = max(1, min(n_jobs, cpus // self.config.threads_per_job))
+
+        memory_per_eval_mb = self.config.memory_per_eval_mb
+        if memory_per_eval_mb is None:
+            memory_per_eval_mb = int(_WORKER_OVERHEAD_MB + _DATA_COPIES_PER_EVAL * data_nbytes(X) / 2. ** 20)
+        if memory_mb is not None:
+            n_jobs = max(1, min(n_jobs, int(memory_mb // memory_per_eval_mb)))
+
+        threads_per_job = self.config.threads_per_job
+        if threads_per_job is None:
+            threads_per_job = max(1, cpus // n_jobs)
+
+        plan = ResourcePlan(n_jobs, threads_per_job, memory_per_eval_mb, cpus,
+                            None if memory_mb is None else int(memory_mb))
+        self.logger.info(f"Resource plan: [{plan.n_jobs}] concurrent evaluations with [{plan.threads_per_job}] "
+                         f"threads each on [{plan.cpu_count}] cores, [{plan.memory_per_eval_mb}] MB per evaluation "
+                         f"out of [{plan.available_memory_mb}] MB available")
+        return plan
+
+    def eval_memory_limit_mb(self, plan):
+        """
+        Hard memory ceiling of one evaluation, by default an even share of the available
+        memory between the concurrent evaluations.
+        """
+        if self.config.max_eval_memory_mb is not None:
+            return self.config.max_eval_memory_mb
+        if plan.available_memory_mb is None:
+            return None
+        return max(plan.memory_per_eval_mb, plan.available_memory_mb // plan.n_jobs)
+
+    @staticmethod
+    def pin_threads(plan):
+        """
+        Pin the BLAS / OpenMP thread pools of worker processes started from now on.
+        """
+        for variable in _THREAD_VARIABLES:
+            os.environ[variable] = str(plan.threads_per_job)
+
+    @staticmethod
+    def apply_to_config_dict(config_dict, plan):
+        """
+        Copy of a TPOT config dict in which estimator-level parallelism (n_jobs / nthread)
+        is fixed to the planned number of threads per evaluation.
+        """
+        governed = {}
+        for operator, parameters in config_dict.items():
+            if parameters is None:
+                governed[operator] = parameters
+                continue
+            parameters = {
+                name: ResourceGovernor.apply_to_config_dict(value, plan) if isinstance(value, dict) else value
+                for name, value in parameters.items()
+            }
+            for name in ["n_jobs", "nthread"]:
+                if name in parameters:
+                    parameters[name] = [plan.threads_per_job]
+            if operator in _THREADED_ESTIMATORS and "nthread" not in parameters:
+                parameters["n_jobs"] = [plan.threads_per_job]
+            governed[operator] = parameters
+        return governed
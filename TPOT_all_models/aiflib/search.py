@@ -0,0 +1,206 @@
+import time
+
+import numpy as np
+from deap import creator
+from sklearn.pipeline import Pipeline
+from tpot import TPOTClassifier
+
+from aiflib.gate import serving_cost
+from aiflib.logger import Logger
+
+
+class SearchClassifier(TPOTClassifier):
+    """
+    TPOTClassifier which runs a list of callbacks after every generation of the search.
+    A callback is called as callback(optimizer, generation) and may raise StopIteration
+    to end the search with the best pipeline found so far.
+
+    If resume_state (see aiflib.checkpoint.SearchCheckpoint) is set, the search starts
+    from its population and reuses the scores of the pipelines it already evaluated.
+    """
+    generation_callbacks = ()
+    resume_state = None
+
+    def _fit_init(self):
+        super(SearchClassifier, self)._fit_init()
+        if self.resume_state is None:
+            return
+
+        self.evaluated_individuals_.update(self.resume_state["evaluated_individuals"])
+        population = []
+        for pipeline in self.resume_state["population"]:
+            try:
+                population.append(creator.Individual.from_string(pipeline, self._pset))
+            except Exception:
+                # The pipeline uses operators or parameters no longer in the config dict
+                continue
+        if population:
+            self._pop = population
+        self.resume_state = None
+
+    def _check_periodic_pipeline(self, gen):
+        super(SearchClassifier, self)._check_periodic_pipeline(gen)
+        for callback in self.generation_callbacks:
+            callback(self, gen)
+
+
+class PlateauStopper:
+    """
+    Stops the search once the best internal CV score has not improved by more than
+    min_delta for a number of generations or a number of minutes.
+    """
+    def __init__(self, min_delta=0.0, generations=None, minutes=None, max_time_mins=None):
+        self.logger = Logger(__name__)
+        self.min_delta = min_delta
+        self.generations = generations
+        self.minutes = minutes
+        self.max_time_mins = max_time_mins
+        self.start_time = time.time()
+        self.best_score = None
+        self.best_time = self.start_time
+        self.generations_without_improvement = 0
+        self.generations_seen = 0
+
+    def __call__(self, optimizer, gen):
+        now = time.time()
+        self.generations_seen += 1
+        score = optimizer._optimized_pipeline_score
+        if score is None:
+            return
+
+        if self.best_score is None or score > self.best_score + self.min_delta:
+            self.best_score = score
+            self.best_time = now
+            self.generations_without_improvement = 0
+            return
+
+        self.generations_without_improvement += 1
+        stale_minutes = (now - self.best_time) / 60.
+        if self.generations is not None and self.generations_without_improvement >= self.generations:
+            reason = f"not improved by more than [{self.min_delta}] for [{self.generations_without_improvement}] generations"
+        elif self.minutes is not None and stale_minutes >= self.minutes:
+            reason = f"not improved by more than [{self.min_delta}] for [{stale_minutes:.1f}] minutes"
+        else:
+            return
+
+        elapsed_minutes = (now - self.start_time) / 60.
+        self.logger.info(f"Best CV score [{self.best_score:.5f}] has {reason}, stopping the search "
+                         f"after [{elapsed_minutes:.1f}] minutes, saving [{self.saved_minutes(optimizer, now):.1f}] minutes.")
+        raise StopIteration(f"The best CV score has {reason}.")
+
+    def saved_minutes(self, optimizer, now):
+        elapsed_minutes = (now - self.start_time) / 60.
+        if self.max_time_mins:
+            return max(0., self.max_time_mins - elapsed_minutes)
+        # Generation limited search: extrapolate from the mean generation time
+        remaining_generations = max(0, optimizer.generations - self.generations_seen)
+        return remaining_generations * elapsed_minutes / self.generations_seen
+
+
+def class_priors(y):
+    """
+    Proportion of every class of the labels y.
+    """
+    classes, counts = np.unique(y, return_counts=True)
+    return {str(label): float(count) / len(y) for label, count in zip(classes, counts)}
+
+
+def search_subsample(X, y, fraction, strategy="stratified", random_state=None):
+    """
+    Rows of the training data the search runs on.
+
+    "uniform" samples a fraction of the rows at random, "stratified" keeps the class
+    proportions, "balanced" takes up to fraction * rows / classes rows of every class,
+    keeping more of the minority classes; its class priors differ from those of y (see
+    class_priors), so it is only used with metrics which do not depend on them.
+    """
+    if fraction >= 1.0:
+        return X, y
+    rng = np.random.RandomState(random_state)
+    classes, y_codes, counts = np.unique(y, return_inverse=True, return_counts=True)
+    n_rows = max(len(classes), int(round(fraction * len(y))))
+
+    if strategy == "balanced":
+        quota = int(np.ceil(n_rows / len(classes)))
+        rows = np.concatenate([
+            rng.choice(np.flatnonzero(y_codes == code), min(count, quota), replace=False)
+            for code, count in enumerate(counts)])
+    elif strategy == "stratified":
+        # Largest remainder allocation of the rows to the classes, at least one row per class
+        exact = counts * n_rows / len(y)
+        allocation = np.maximum(1, np.floor(exact).astype(int))
+        remainder = n_rows - allocation.sum()
+        if remainder > 0:
+            allocation[np.argsort(allocation - exact)[:remainder]] += 1
+        rows = np.concatenate([
+            rng.choice(np.flatnonzero(y_codes == code), min(count, allocation[code]), replace=False)
+            for code, count in enumerate(counts)])
+    else:
+        rows = rng.choice(len(y), n_rows, replace=False)
+
+    rows.sort()
+    return X[rows], y[rows]
+
+
+def select_by_serving_cost(optimizer, preprocessing, X, y, X_sample, candidates=10, latency_budget_ms=20.,
+                           size_budget_mb=None, tolerance=0.005, request_rows=1):
+    """
+    Choose the pipeline to deploy among the best evaluated pipelines of a search by CV
+    score and serving cost.
+
+    The `candidates` best pipelines by internal CV score are fitted on the search data X, y
+    and measured behind the fitted preprocessing steps on the raw rows X_sample (p99 latency
+    of requests of request_rows rows and pickled size). Among the pipelines within
+    latency_budget_ms and size_budget_mb, the fastest one whose CV score is within tolerance
+    of the best of them is chosen; if none is within the budgets, the fastest one.
+    Returns (individual, fitted pipeline, CV score, report) of the chosen pipeline.
+    """
+    logger = Logger(__name__)
+    scored = [(name, values["internal_cv_score"]) for name, values in optimizer.evaluated_individuals_.items()
+              if np.isfinite(values.get("internal_cv_score", -np.inf))]
+    scored.sort(key=lambda item: -item[1])
+
+    best_name = str(optimizer._optimized_pipeline)
+    measured = []
+    for name, score in scored[:candidates]:
+        try:
+            individual = creator.Individual.from_string(name, optimizer._pset)
+            if name == best_name:
+                pipeline = optimizer.fitted_pipeline_
+            else:
+                pipeline = optimizer._toolbox.compile(expr=individual)
+                pipeline.fit(X, y)
+            cost = serving_cost(Pipeline(preprocessing + [("tpot_pipeline", pipeline)]), X_sample, request_rows)
+        except Exception as e:
+            logger.info(f"Skipping candidate [{name}]: {e}")
+            continue
+        within_budget = cost["latency_ms_p99"] <= latency_budget_ms and \
+            (size_budget_mb is None or cost["size_mb"] <= size_budget_mb)
+        measured.append({"pipeline": name, "cv_score": score, "cost": cost, "within_budget": within_budget,
+                         "individual": individual, "fitted": pipeline})
+
+    if not measured:
+        raise ValueError("None of the candidate pipelines could be fitted and measured")
+
+    feasible = [candidate for candidate in measured if candidate["within_budget"]]
+    if feasible:
+        top_score = max(candidate["cv_score"] for candidate in feasible)
+        chosen = min([candidate for candidate in feasible if candidate["cv_score"] >= top_score - tolerance],
+                     key=lambda candidate: candidate["cost"]["latency_ms_p99"])
+    else:
+        chosen = min(measured, key=lambda candidate: candidate["cost"]["latency_ms_p99"])
+        logger.info(f"No candidate pipeline meets the latency budget of [{latency_budget_ms}] ms"
+                    f"{'' if size_budget_mb is None else f' and size budget of [{size_budget_mb}] MB'}, "
+                    f"choosing the fastest one")
+
+    logger.info(f"Selected [{chosen['pipeline']}] with CV score [{chosen['cv_score']:.5f}] and p99 latency "
+                f"[{chosen['cost']['latency_ms_p99']:.2f}] ms out of [{len(measured)}] candidates, the best CV score "
+                f"[{measured[0]['cv_score']:.5f}] has p99 latency [{measured[0]['cost']['latency_ms_p99']:.2f}] ms")
+    report = {
+        "latency_budget_ms": latency_budget_ms,
+        "size_budget_mb": size_budget_mb,
+        "selected": chosen["pipeline"],
+        "candidates": [{key: candidate[key] for key in ["pipeline", "cv_score", "cost", "within_budget"]}
+                       for candidate in measured],
+    }
+    return chosen["individual"], chosen["fitted"], chosen["cv_score"], report
@@ -0,0 +1,232 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from aiflib.config import Config
+from aiflib.logger import Logger
+
+# Phases of a predict request, in order
+PHASES = ["decode", "pipeline", "encode", "total"]
+PERCENTILES = [50, 95, 99, 99.9]
+
+
+class Histogram:
+    """
+    Log-linear histogram in the spirit of HdrHistogram: every bucket is relative_error
+    wide relative to its value, so percentiles are within relative_error of the recorded
+    values over any range, in memory proportional to the number of occupied buckets.
+    Values at or below lowest share the first bucket.
+    """
+    def __init__(self, relative_error=0.01, lowest=1e-6):
+        self.relative_error = relative_error
+        self.lowest = lowest
+        self._log_growth = math.log1p(2 * relative_error)
+        self.counts = {}
+        self.count = 0
+        self.total = 0.
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_growth) + 1
+
+    def _value(self, index):
+        if index == 0:
+            return self.lowest
+        # Middle of [lowest * growth^(index - 1), lowest * growth^index)
+        return self.lowest * math.exp((index - 1) * self._log_growth) * (1 + self.relative_error)
+
+    def record(self, value):
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percentile):
+        if self.count == 0:
+            return None
+        rank = max(1, int(math.ceil(percentile / 100. * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def summary(self, scale=1.):
+        """
+        Count, mean, min, max and percentiles (p50, p95, p99, p99.9), multiplied by scale.
+        """
+        if self.count == 0:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count * scale,
+            "min": self.min * scale,
+            "max": self.max * scale,
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile:g}"] = self.percentile(percentile) * scale
+        return summary
+
+
+class _Request:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = {}
+        self.rows = None
+        self.failed_phase = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failed_phase = name
+            raise
+        finally:
+            self.seconds[name] = time.perf_counter() - start
+
+
+class ServingMetrics:
+    """
+    Latency of the phases of predict (decode the request, run the pipeline, encode the
+    response, and in total), rows per request and errors per phase of this process.
+
+    Requests are recorded with
+        with metrics.request() as request:
+            with request.phase("decode"):
+                ...
+            request.rows = ...
+    snapshot() returns the current statistics (latencies in milliseconds), which are also
+    written to artifacts_directory every serving_metrics_interval_secs.
+    """
+    def __init__(self, dump_directory=None, interval_secs=60, dump_format="json"):
+        self.logger = Logger(__name__)
+        self.dump_directory = dump_directory
+        self.interval_secs = interval_secs
+        self.dump_format = dump_format
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.last_dump = self.started_at
+            self.latency = {phase: Histogram() for phase in PHASES}
+            self.rows = Histogram(lowest=1.)
+            self.requests = 0
+            self.total_rows = 0
+            self.errors = {}
+
+    @contextmanager
+    def request(self):
+        request = _Request()
+        try:
+            yield request
+        except Exception:
+            self.record(request, request.failed_phase or "total")
+            raise
+        else:
+            self.record(request)
+
+    def record(self, request, failed_phase=None):
+        request.seconds["total"] = time.perf_counter() - request.start
+        with self._lock:
+            self.requests += 1
+            if failed_phase is not None:
+                self.errors[failed_phase] = self.errors.get(failed_phase, 0) + 1
+            else:
+                for phase, seconds in request.seconds.items():
+                    self.latency[phase].record(seconds)
+            if request.rows is not None:
+                self.rows.record(request.rows)
+                self.total_rows += request.rows
+            due = self.interval_secs > 0 and self.dump_directory is not None and \
+                time.time() - self.last_dump >= self.interval_secs
+            if due:
+                self.last_dump = time.time()
+        if due:
+            self.dump()
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.time() - self.started_at
+            return {
+                "started_at": self.started_at,
+                "uptime_seconds": uptime,
+                "pid": os.getpid(),
+                "requests": self.requests,
+                "errors": dict(self.errors),
+                "rows": self.total_rows,
+                "requests_per_second": self.requests / max(uptime, 1e-9),
+                "rows_per_second": self.total_rows / max(uptime, 1e-9),
+                "latency_ms": {phase: histogram.summary(scale=1000.) for phase, histogram in self.latency.items()},
+                "rows_per_request": self.rows.summary(),
+            }
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP aiflib_predict_seconds Latency of the phases of a predict request.",
+            "# TYPE aiflib_predict_seconds summary",
+        ]
+        for phase, summary in snapshot["latency_ms"].items():
+            for percentile in PERCENTILES:
+                if summary["count"]:
+                    quantile = f"{percentile / 100.:g}"
+                    lines.append(f'aiflib_predict_seconds{{phase="{phase}",quantile="{quantile}"}} '
+                                 f'{summary[f"p{percentile:g}"] / 1000.:.6f}')
+            lines.append(f'aiflib_predict_seconds_sum{{phase="{phase}"}} '
+                         f'{summary.get("mean", 0.) * summary["count"] / 1000.:.6f}')
+            lines.append(f'aiflib_predict_seconds_count{{phase="{phase}"}} {summary["count"]}')
+        lines += ["# HELP aiflib_predict_requests_total Predict requests.", "# TYPE aiflib_predict_requests_total counter",
+                  f"aiflib_predict_requests_total {snapshot['requests']}"]
+        lines += ["# HELP aiflib_predict_rows_total Rows predicted.", "# TYPE aiflib_predict_rows_total counter",
+                  f"aiflib_predict_rows_total {snapshot['rows']}"]
+        lines += ["# HELP aiflib_predict_errors_total Failed predict requests by phase.",
+                  "# TYPE aiflib_predict_errors_total counter"]
+        for phase, errors in sorted(snapshot["errors"].items()):
+            lines.append(f'aiflib_predict_errors_total{{phase="{phase}"}} {errors}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        """
+        Write the statistics to dump_directory/serving_metrics.json (or .prom), replacing the
+        previous dump atomically. A failed write is logged and does not fail the request.
+        """
+        if self.dump_format == "prometheus":
+            path, content = os.path.join(self.dump_directory, "serving_metrics.prom"), self.to_prometheus()
+        else:
+            path, content = os.path.join(self.dump_directory, "serving_metrics.json"), json.dumps(self.snapshot())
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, "w") as metrics_file:
+                metrics_file.write(content)
+            os.replace(temporary_path, path)
+        except (IOError, OSError) as e:
+            self.logger.info(f"Could not write serving metrics to {path}: {e}")
+        return path
+
+
+_serving_metrics = None
+
+
+def serving_metrics():
+    """
+    The serving metrics of this process.
+    """
+    global _serving_metrics
+    if _serving_metrics is None:
+        config = Config()
+        _serving_metrics = ServingMetrics(
+            config.artifacts_directory, config.serving_metrics_interval_secs, config.profiling_format)
+    return _serving_metrics
@@ -0,0 +1,195 @@
+import itertools
+import time
+
+import numpy as np
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from aiflib.logger import Logger, UiPathUsageException
+
+# Parameters of the config dict which do not apply to the native search
+_WRAPPER_PARAMETERS = ["n_estimators", "nthread", "n_jobs"]
+
+
+def _import_xgboost():
+    try:
+        import xgboost
+    except ImportError as e:
+        raise UiPathUsageException(f"the xgboost search requires xgboost to be installed: {e}")
+    return xgboost
+
+
+class _Predictions:
+    """
+    Classifier facade over precomputed class probabilities, so that the sklearn scorers
+    score them exactly like a fitted pipeline.
+    """
+    _estimator_type = "classifier"
+
+    def __init__(self, probabilities, classes):
+        self.probabilities = probabilities
+        self.classes_ = classes
+
+    def predict_proba(self, X):
+        return self.probabilities
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.probabilities, axis=1)]
+
+
+def _predict_best(booster, dmatrix):
+    try:
+        return booster.predict(dmatrix, iteration_range=(0, booster.best_iteration + 1))
+    except TypeError:
+        # xgboost < 1.4
+        return booster.predict(dmatrix, ntree_limit=booster.best_ntree_limit)
+
+
+class XGBoostSearch:
+    """
+    Random search of XGBClassifier parameters on xgboost's native API.
+
+    The training matrix is converted to one DMatrix and sliced into the cv folds once;
+    with tree_method "hist" every slice is quantised on its first use and the bins are
+    reused by all the candidates. Each candidate trains on every fold for up to its
+    n_estimators rounds, stopping early on early_stopping_fraction of the fold's training
+    rows rather than on the held out rows it is scored on, and is scored with the sklearn
+    scoring metric like a TPOT evaluation. The search stops after max_candidates, after
+    max_time_mins or once the grid is exhausted; the best parameters are refitted on all
+    rows as an XGBClassifier with the mean number of rounds of their folds.
+    """
+    def __init__(self, param_grid, scoring="accuracy", cv=5, max_time_mins=None, max_candidates=None,
+                 early_stopping_rounds=10, early_stopping_fraction=0.1, nthread=1, random_state=None):
+        self.logger = Logger(__name__)
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.cv = cv
+        self.max_time_mins = max_time_mins
+        self.max_candidates = max_candidates
+        self.early_stopping_rounds = early_stopping_rounds
+        self.early_stopping_fraction = early_stopping_fraction
+        self.nthread = nthread
+        self.random_state = random_state
+        self.results_ = []
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_rounds_ = None
+        self.best_estimator_ = None
+
+    def sample(self):
+        """
+        Distinct parameter sets of the grid in a random order (including n_estimators).
+        """
+        names = sorted(self.param_grid)
+        values = [list(self.param_grid[name]) for name in names]
+        size = int(np.prod([len(value) for value in values]))
+        rng = np.random.RandomState(self.random_state)
+        if size <= 100000:
+            for index in rng.permutation(size):
+                yield dict(zip(names, [value[position] for value, position in
+                                       zip(values, np.unravel_index(index, [len(value) for value in values]))]))
+            return
+        seen = set()
+        while True:
+            positions = tuple(rng.randint(len(value)) for value in values)
+            if positions not in seen:
+                seen.add(positions)
+                yield dict(zip(names, [value[position] for value, position in zip(values, positions)]))
+
+    def native_params(self, params, n_classes):
+        native = {name: value for name, value in params.items() if name not in _WRAPPER_PARAMETERS}
+        native = {name: value.item() if isinstance(value, np.generic) else value for name, value in native.items()}
+        native.update(tree_method="hist", nthread=self.nthread, seed=self.random_state or 0, verbosity=0)
+        if n_classes > 2:
+            native.update(objective="multi:softprob", num_class=n_classes)
+        else:
+            native.update(objective="binary:logistic")
+        if self.scoring.startswith("roc_auc"):
+            native["eval_metric"] = "auc"
+        else:
+            native["eval_metric"] = "mlogloss" if n_classes > 2 else "logloss"
+        return native
+
+    def max_rounds(self):
+        return int(max(self.param_grid.get("n_estimators", [100])))
+
+    def folds(self, dtrain, y):
+        """
+        (fit, early stopping, validation) slices of dtrain and the validation labels of
+        every cv fold. The early stopping rows are taken from the training rows of the fold
+        so that the number of rounds is not chosen on the rows the fold is scored on.
+        """
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        folds = []
+        for train_rows, valid_rows in splitter.split(np.zeros(len(y)), y):
+            can_stratify = self.early_stopping_fraction * len(train_rows) >= len(np.unique(y[train_rows]))
+            fit_rows, stop_rows = train_test_split(
+                train_rows, test_size=self.early_stopping_fraction, random_state=self.random_state,
+                stratify=y[train_rows] if can_stratify else None)
+            folds.append((dtrain.slice(np.sort(fit_rows)), dtrain.slice(np.sort(stop_rows)),
+                          dtrain.slice(valid_rows), y[valid_rows]))
+        return folds
+
+    def evaluate(self, params, folds, classes):
+        """
+        Mean CV score and mean best number of rounds of one parameter set.
+        """
+        xgboost = _import_xgboost()
+        scorer = get_scorer(self.scoring)
+        native = self.native_params(params, len(classes))
+        scores, rounds = [], []
+        for dfit, dstop, dvalid, y_valid in folds:
+            booster = xgboost.train(
+                native, dfit, num_boost_round=int(params.get("n_estimators", self.max_rounds())), evals=[(dstop, "stop")],
+                early_stopping_rounds=self.early_stopping_rounds, verbose_eval=False)
+            probabilities = _predict_best(booster, dvalid)
+            if probabilities.ndim == 1:
+                probabilities = np.column_stack([1. - probabilities, probabilities])
+            scores.append(scorer(_Predictions(probabilities, classes), None, y_valid))
+            rounds.append(booster.best_iteration + 1)
+        return float(np.mean(scores)), int(round(np.mean(rounds)))
+
+    def search(self, X, y, candidates=None):
+        """
+        Evaluate candidates (by default sample()) on the folds of X, y within the budget.
+        """
+        xgboost = _import_xgboost()
+        classes = np.unique(y)
+        start = time.time()
+        dtrain = xgboost.DMatrix(X, label=np.searchsorted(classes, y), nthread=self.nthread)
+        folds = self.folds(dtrain, np.searchsorted(classes, y))
+        candidates = self.sample() if candidates is None else candidates
+        if self.max_candidates is not None:
+            candidates = itertools.islice(candidates, self.max_candidates)
+
+        self.results_ = []
+        for params in candidates:
+            if self.max_time_mins is not None and self.results_ and time.time() - start >= 60. * self.max_time_mins:
+                break
+            evaluation_start = time.time()
+            try:
+                score, rounds = self.evaluate(params, folds, np.arange(len(classes)))
+            except Exception as e:
+                self.logger.info(f"Skipping xgboost candidate {params}: {e}")
+                continue
+            self.results_.append({"params": params, "cv_score": score, "rounds": rounds,
+                                  "seconds": time.time() - evaluation_start})
+            if self.best_score_ is None or score > self.best_score_:
+                self.best_params_, self.best_score_, self.best_rounds_ = params, score, rounds
+        if not self.results_:
+            raise ValueError("None of the xgboost candidates could be evaluated")
+        self.logger.info(f"Evaluated [{len(self.results_)}] xgboost candidates in [{time.time() - start:.1f}] s, "
+                         f"best CV score [{self.best_score_:.5f}] with {self.best_params_} and [{self.best_rounds_}] rounds")
+        return self
+
+    def best_classifier(self):
+        xgboost = _import_xgboost()
+        params = {name: value for name, value in self.best_params_.items() if name not in _WRAPPER_PARAMETERS}
+        return xgboost.XGBClassifier(
+            n_estimators=self.best_rounds_, tree_method="hist", n_jobs=self.nthread,
+            random_state=self.random_state or 0, **params)
+
+    def fit(self, X, y, candidates=None):
+        self.search(X, y, candidates)
+        self.best_estimator_ = self.best_classifier().fit(X, y)
+        return self
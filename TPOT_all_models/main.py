@@ -1,3 +1,4 @@
+import json
 import pandas as pd 
 
 from aiflib.model import Model, _UNTRAINED_HELP
@@ -12,6 +13,9 @@ class Main(object):
     def predict(self, mlskill_input):
         return self.model.predict(mlskill_input)
 
+    def metrics(self):
+        return json.dumps(self.model.serving_metrics())
+
 
 if __name__ == '__main__':
 
@@ -20,13 +20,6 @@ class Main:
     def process_data(self, directory):
         self.model.process_data(directory)
 
-if __name__ == "__main__":
-
-    # os.environ["csv_name"] = "train.csv"
-    os.environ["target_column"] = "Churn"
-    os.environ["max_time_mins"] = "2"        
-    os.environ["warm_start"] = "false"
- 
 @contextmanager
 def timing(description: str) -> None:
     print("-"*50)
@@ -35,14 +28,22 @@ def timing(description: str) -> None:
     yield
     ellapsed_time = time() - start
     print(f"{description} time: {ellapsed_time}")
-    
-with timing("Initialize"):
-    m = Main()
-with timing("Process data"):
-    m.process_data("dataset")
-with timing("Evaluate"):
-    m.evaluate("dataset/test")
-with timing("Train"):
-    m.train("dataset/training")
-with timing("Evaluate"):
-    m.evaluate("dataset/test")
\ No newline at end of file
+
+if __name__ == "__main__":
+
+    # os.environ["csv_name"] = "train.csv"
+    os.environ["target_column"] = "Churn"
+    os.environ["max_time_mins"] = "2"        
+    os.environ["warm_start"] = "false"
+
+    # Worker processes (e.g. dask_workers) re-import this module, keep the run under the guard
+    with timing("Initialize"):
+        m = Main()
+    with timing("Process data"):
+        m.process_data("dataset")
+    with timing("Evaluate"):
+        m.evaluate("dataset/test")
+    with timing("Train"):
+        m.train("dataset/training")
+    with timing("Evaluate"):
+        m.evaluate("dataset/test")
\ No newline at end of file
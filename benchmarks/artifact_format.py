@@ -0,0 +1,88 @@
+"""
+Size and load time of a fitted pipeline saved as a single joblib pickle (Model.sav)
+and as a compact artifact (aiflib.artifact: one compressed file per step, loaded on demand).
+
+"load" is the time to open the model, "first predict" includes loading the steps of the
+compact artifact on first use.
+
+Usage: python benchmarks/artifact_format.py [--model path/to/Model.sav] [--rows 50000] [--columns 50] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TPOT_all_models"))
+
+import joblib
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import ExtraTreesClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from aiflib.artifact import LazyPipeline, save_artifact
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        times.append(time.time() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="existing Model.sav, by default an ExtraTrees pipeline is fitted")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.model:
+        model = joblib.load(args.model)
+        # The nan_imputer of Model.sav is fitted on all the feature columns
+        args.columns = model.named_steps["nan_imputer"].statistics_.shape[0]
+    X, y = make_classification(n_samples=args.rows, n_features=args.columns, random_state=0)
+    if not args.model:
+        model = Pipeline([
+            ("nan_imputer", SimpleImputer()),
+            ("tpot_pipeline", make_pipeline(StandardScaler(), ExtraTreesClassifier(n_estimators=100, random_state=0))),
+        ]).fit(X, y)
+    batch = X[:100]
+
+    directory = tempfile.mkdtemp()
+    try:
+        pickle_path = os.path.join(directory, "Model.sav")
+        artifact_path = os.path.join(directory, "artifact")
+        joblib.dump(model, pickle_path)
+        save_artifact(model, artifact_path)
+
+        results = []
+        load, loaded = timed(lambda: joblib.load(pickle_path), args.repeat)
+        first, _ = timed(lambda: joblib.load(pickle_path).predict(batch), args.repeat)
+        results.append(("joblib", os.path.getsize(pickle_path), load, first))
+
+        load, loaded = timed(lambda: LazyPipeline(artifact_path), args.repeat)
+        first, _ = timed(lambda: LazyPipeline(artifact_path).predict(batch), args.repeat)
+        results.append(("compact", directory_size(artifact_path), load, first))
+        assert np.array_equal(model.predict(batch), loaded.predict(batch))
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"{'format':<10}{'size (MB)':>11}{'load (s)':>10}{'first predict (s)':>19}")
+    for name, size, load, first in results:
+        print(f"{name:<10}{size / 2. ** 20:>11.2f}{load:>10.3f}{first:>19.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Throughput of candidate pipeline evaluations with and without oversubscription.
+
+"oversubscribed" reproduces the previous build_model setup: one worker per core, each
+estimator using every core (n_jobs / nthread = -1) and unbounded BLAS thread pools.
+"governed" uses the plan of aiflib.resources.ResourceGovernor.
+
+Usage: python benchmarks/oversubscription.py [--rows 50000] [--columns 50] [--repeat 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TPOT_all_models"))
+
+from joblib import Parallel, delayed
+from joblib.externals.loky import get_reusable_executor
+from sklearn.datasets import make_classification
+from sklearn.ensemble import ExtraTreesClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+from aiflib.evaluation import PipelineEvaluator
+from aiflib.resources import ResourceGovernor
+
+
+def candidates(n_jobs, repeat):
+    pipelines = [
+        make_pipeline(ExtraTreesClassifier(n_estimators=100, n_jobs=n_jobs)),
+        make_pipeline(StandardScaler(), KNeighborsClassifier(n_neighbors=25, n_jobs=n_jobs)),
+        make_pipeline(PolynomialFeatures(degree=2, include_bias=False), LogisticRegression(max_iter=200)),
+    ]
+    try:
+        from xgboost import XGBClassifier
+        pipelines.append(make_pipeline(XGBClassifier(n_estimators=100, nthread=n_jobs)))
+    except ImportError:
+        pass
+    return pipelines * repeat
+
+
+def run(X, y, pipelines, n_jobs, threads):
+    evaluator = PipelineEvaluator(threads=threads)
+    start = time.time()
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(evaluator)(pipeline, X, y, cv=3, scoring_function="accuracy") for pipeline in pipelines)
+    elapsed = time.time() - start
+    get_reusable_executor().shutdown(wait=True)
+    return elapsed, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=4)
+    args = parser.parse_args()
+
+    X, y = make_classification(n_samples=args.rows, n_features=args.columns, random_state=0)
+    governor = ResourceGovernor()
+    plan = governor.plan(X)
+
+    results = []
+    elapsed, _ = run(X, y, candidates(-1, args.repeat), plan.cpu_count, None)
+    results.append(("oversubscribed", plan.cpu_count, "all", elapsed))
+
+    governor.pin_threads(plan)
+    elapsed, _ = run(X, y, candidates(plan.threads_per_job, args.repeat), plan.n_jobs, plan.threads_per_job)
+    results.append(("governed", plan.n_jobs, plan.threads_per_job, elapsed))
+
+    n_evaluations = len(candidates(1, args.repeat))
+    print(f"{n_evaluations} evaluations, {args.rows} rows x {args.columns} columns, {plan.cpu_count} cores")
+    print(f"{'mode':<16}{'n_jobs':>8}{'threads':>9}{'time (s)':>10}{'evals/min':>11}")
+    for mode, n_jobs, threads, elapsed in results:
+        print(f"{mode:<16}{n_jobs:>8}{threads:>9}{elapsed:>10.1f}{60 * n_evaluations / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Memory of one-hot encoding high-cardinality categorical columns to a dense matrix
+(tpot.builtins.OneHotEncoder with sparse=False, as in classifier_config_dict) and to a CSR
+matrix (aiflib.encoding.SparseEncoder), and of fitting a classifier on the result.
+
+Peak memory is measured with tracemalloc, which tracks numpy and scipy allocations.
+
+Usage: python benchmarks/sparse_memory.py [--rows 20000] [--categorical 5] [--categories 1000] [--numeric 10]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TPOT_all_models"))
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from aiflib.encoding import SparseEncoder
+from aiflib.resources import data_nbytes
+
+
+def synthetic(rows, n_categorical, n_categories, n_numeric, seed=0):
+    """
+    Categorical columns with Zipf distributed categories, the label depends on a few of them.
+    """
+    rng = np.random.RandomState(seed)
+    codes = np.minimum(rng.zipf(1.3, size=(rows, n_categorical)), n_categories) - 1
+    numeric = rng.normal(size=(rows, n_numeric))
+    logits = numeric[:, 0] + np.where(codes[:, 0] % 7 == 0, 2., -0.5) + np.where(codes[:, 1] % 3 == 0, 1., 0.)
+    y = (logits + rng.logistic(size=rows) > 0).astype(int)
+
+    X = np.empty((rows, n_numeric + n_categorical), dtype=object)
+    X[:, :n_numeric] = numeric
+    X[:, n_numeric:] = np.char.add("c", codes.astype(str))
+    return X, y, list(range(n_numeric, n_numeric + n_categorical))
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.time()
+    result = function()
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak / 2. ** 20, elapsed
+
+
+def dense(X, y, categorical_columns):
+    from tpot.builtins import OneHotEncoder
+    # Ordinal codes as TPOT's OneHotEncoder expects numeric input
+    numeric = X.copy()
+    for column in categorical_columns:
+        numeric[:, column] = np.unique(X[:, column], return_inverse=True)[1]
+    encoder = OneHotEncoder(categorical_features=categorical_columns, sparse=False, minimum_fraction=None)
+    encoded = encoder.fit_transform(numeric.astype(np.float64))
+    SGDClassifier(loss="log", max_iter=5, tol=None, random_state=0).fit(encoded, y)
+    return encoded
+
+
+def compressed(X, y, categorical_columns):
+    encoded = SparseEncoder(categorical_columns).fit(X).transform(X)
+    SGDClassifier(loss="log", max_iter=5, tol=None, random_state=0).fit(encoded, y)
+    return encoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--categorical", type=int, default=5)
+    parser.add_argument("--categories", type=int, default=1000)
+    parser.add_argument("--numeric", type=int, default=10)
+    args = parser.parse_args()
+
+    X, y, categorical_columns = synthetic(args.rows, args.categorical, args.categories, args.numeric)
+
+    results = []
+    for name, function in [("dense", dense), ("sparse", compressed)]:
+        encoded, peak_mb, elapsed = measure(lambda: function(X, y, categorical_columns))
+        results.append((name, encoded.shape[1], data_nbytes(encoded) / 2. ** 20, peak_mb, elapsed))
+
+    print(f"{args.rows} rows, {args.numeric} numeric and {args.categorical} categorical columns "
+          f"with up to {args.categories} categories")
+    print(f"{'format':<8}{'columns':>9}{'matrix (MB)':>13}{'peak (MB)':>11}{'time (s)':>10}")
+    for name, columns, matrix_mb, peak_mb, elapsed in results:
+        print(f"{name:<8}{columns:>9}{matrix_mb:>13.1f}{peak_mb:>11.1f}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Smoke benchmark of the sparse search space, Config.sparse_classifier_config_dict on the
+CSR matrix of aiflib.encoding.SparseEncoder, with and without Config.sparse_template.
+
+Without the template TPOT also places classifiers inside the pipeline, wrapped in a
+StackingEstimator which only takes dense input. TPOT fits every new pipeline on a few rows
+before evaluating it and generates another one when this fails, so these pipelines waste
+generation attempts rather than evaluations.
+
+For each search space, --pipelines random pipelines drawn from it are fitted on a sample of
+the rows: reported are those with a StackingEstimator step, those which failed to fit as
+an operator required dense input, and those which failed otherwise (operators selecting no
+columns, unsupported parameter combinations and the like). Then a short search runs in it:
+reported are the evaluated pipelines, the search time and the hold-out accuracy of the
+fitted pipeline, predicting from the CSR matrix.
+
+Usage: python benchmarks/sparse_search.py [--rows 5000] [--pipelines 200] [--generations 3] [--population 20]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TPOT_all_models"))
+
+from scipy import sparse
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from tpot import TPOTClassifier
+from tpot.builtins import StackingEstimator
+
+from aiflib.config import Config
+from aiflib.encoding import SparseEncoder
+from sparse_memory import synthetic
+
+
+def random_pipelines(optimizer, X, y, n_pipelines, sample_rows=500):
+    """
+    Number of random pipelines of the search space of optimizer with a StackingEstimator
+    step, and numbers of them which failed to fit on the first sample_rows rows as they
+    required dense input, or otherwise.
+    """
+    optimizer._fit_init()
+    stacked, dense_only, failed = 0, 0, 0
+    for _ in range(n_pipelines):
+        pipeline = optimizer._toolbox.compile(expr=optimizer._toolbox.individual())
+        stacked += any(isinstance(step, StackingEstimator) for step in pipeline.named_steps.values())
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                pipeline.fit(X[:sample_rows], y[:sample_rows])
+        except TypeError as e:
+            if "dense data is required" in str(e):
+                dense_only += 1
+            else:
+                failed += 1
+        except Exception:
+            failed += 1
+    return stacked, dense_only, failed
+
+
+def search(optimizer, X_train, y_train, X_test, y_test):
+    start = time.time()
+    optimizer.fit(X_train, y_train)
+    elapsed = time.time() - start
+    assert sparse.issparse(X_test)
+    predictions = optimizer.fitted_pipeline_.predict(X_test)
+    return len(optimizer.evaluated_individuals_), elapsed, accuracy_score(y_test, predictions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--pipelines", type=int, default=200)
+    parser.add_argument("--generations", type=int, default=3)
+    parser.add_argument("--population", type=int, default=20)
+    args = parser.parse_args()
+
+    config = Config()
+    X, y, categorical_columns = synthetic(args.rows, n_categorical=5, n_categories=200, n_numeric=10)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=0)
+    encoder = SparseEncoder(categorical_columns).fit(X_train)
+    X_train, X_test = encoder.transform(X_train), encoder.transform(X_test)
+
+    def optimizer(template):
+        return TPOTClassifier(
+            generations=args.generations, population_size=args.population, cv=3,
+            config_dict=config.sparse_classifier_config_dict, template=template,
+            random_state=0, n_jobs=1, verbosity=0)
+
+    print(f"{X_train.shape[0]} training rows, {X_train.shape[1]} sparse columns, {args.pipelines} random "
+          f"pipelines, search of {args.generations} generations of {args.population} pipelines")
+    print(f"{'template':<34}{'stacked':>9}{'dense only':>12}{'failed':>8}{'evaluated':>11}{'time (s)':>10}"
+          f"{'accuracy':>10}")
+    for template in [None, config.sparse_template]:
+        stacked, dense_only, failed = random_pipelines(optimizer(template), X_train, y_train, args.pipelines)
+        evaluated, elapsed, accuracy = search(optimizer(template), X_train, y_train, X_test, y_test)
+        print(f"{str(template):<34}{stacked:>9}{dense_only:>12}{failed:>8}{evaluated:>11}{elapsed:>10.1f}"
+              f"{accuracy:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
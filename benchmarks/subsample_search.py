@@ -0,0 +1,102 @@
+"""
+Search on a subsample of an imbalanced dataset: uniform (TPOT's subsample), stratified
+and balanced subsamples (aiflib.search.search_subsample) against the full data.
+
+A fixed set of candidate pipelines stands in for a search. For every mode and seed the
+candidates are cross-validated on the subsample with aiflib.evaluation.PipelineEvaluator;
+the best one is refitted on all the training rows and scored on a hold-out set.
+Reported per mode: evaluations per minute, the spread of the CV score of a candidate
+between seeds, the rank correlation of the candidates with their full data ranking and
+the hold-out accuracy / F1 of the selected pipelines.
+
+Usage: python benchmarks/subsample_search.py [--rows 50000] [--minority 0.05] [--fraction 0.1] [--seeds 5]
+                                             [--scoring f1]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TPOT_all_models"))
+
+import numpy as np
+from scipy.stats import spearmanr
+from sklearn.datasets import make_classification
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from aiflib.evaluation import PipelineEvaluator
+from aiflib.search import search_subsample
+
+
+def candidates():
+    return [
+        make_pipeline(GaussianNB()),
+        make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+        make_pipeline(StandardScaler(), LogisticRegression(C=0.01, max_iter=1000)),
+        make_pipeline(StandardScaler(), KNeighborsClassifier(n_neighbors=5)),
+        make_pipeline(StandardScaler(), KNeighborsClassifier(n_neighbors=50)),
+        make_pipeline(ExtraTreesClassifier(n_estimators=50, min_samples_leaf=1, random_state=0)),
+        make_pipeline(ExtraTreesClassifier(n_estimators=50, min_samples_leaf=20, random_state=0)),
+        make_pipeline(GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=0)),
+    ]
+
+
+def cv_scores(X, y, scoring):
+    evaluator = PipelineEvaluator()
+    start = time.time()
+    scores = [evaluator(pipeline, X, y, cv=5, scoring_function=scoring) for pipeline in candidates()]
+    return np.array(scores), time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--minority", type=float, default=0.05)
+    parser.add_argument("--fraction", type=float, default=0.1)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--scoring", default="f1")
+    args = parser.parse_args()
+
+    X, y = make_classification(n_samples=args.rows, n_features=20, n_informative=8,
+                               weights=[1 - args.minority], flip_y=0.01, random_state=0)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=0)
+
+    full_scores, full_time = cv_scores(X_train, y_train, args.scoring)
+    n_candidates = len(full_scores)
+
+    print(f"{len(y_train)} training rows, minority class {args.minority:.0%}, "
+          f"searching on {args.fraction:.0%} of the rows, {args.scoring} CV scores")
+    print(f"{'mode':<12}{'evals/min':>10}{'CV std':>8}{'rank corr':>11}{'accuracy':>10}{'f1':>8}")
+
+    def report(mode, elapsed, spreads, correlations, selected):
+        accuracies, f1s = [], []
+        for index in selected:
+            pipeline = candidates()[index].fit(X_train, y_train)
+            predictions = pipeline.predict(X_test)
+            accuracies.append(accuracy_score(y_test, predictions))
+            f1s.append(f1_score(y_test, predictions))
+        print(f"{mode:<12}{60 * n_candidates / elapsed:>10.1f}{np.mean(spreads):>8.4f}"
+              f"{np.mean(correlations):>11.2f}{np.mean(accuracies):>10.4f}{np.mean(f1s):>8.4f}")
+
+    report("full", full_time, [0.], [1.], [int(np.argmax(full_scores))])
+    for mode in ["uniform", "stratified", "balanced"]:
+        runs, elapsed = [], 0.
+        for seed in range(args.seeds):
+            X_search, y_search = search_subsample(X_train, y_train, args.fraction, mode, seed)
+            scores, seconds = cv_scores(X_search, y_search, args.scoring)
+            runs.append(scores)
+            elapsed += seconds
+        runs = np.array(runs)
+        correlations = [spearmanr(scores, full_scores).correlation for scores in runs]
+        report(mode, elapsed / args.seeds, runs.std(axis=0), correlations, runs.argmax(axis=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+End-to-end benchmark of the three variants (TPOT_all_models, TPOT_xgboost, Autosklearn).
+
+For every dataset and variant the package of the variant (see package.py) is built in a
+scratch workspace and each stage of its Main runs in its own process, with fixed seeds:
+process_data, train (including save), evaluate and predict (one request of --predict-rows
+records through main.py).
+Every stage records wall time, CPU time and utilisation, peak RSS of the stage process
+and of the worker processes it waited for, the score (accuracy, and F1 where available)
+and any error, appended as one JSON line per stage to the results file.
+
+Datasets are synthetic ROWSxCOLUMNS classification problems written to csv in chunks with
+a fixed seed, e.g. 10000x10 up to 10000000x500, or "click" for the website click dataset
+of the README.
+
+Usage:
+    python benchmarks/suite.py [--datasets 10000x10 100000x50 click] [--variants TPOT_all_models ...]
+                               [--train-minutes 2] [--results benchmarks/results.jsonl] [--keep]
+    python benchmarks/suite.py --readme [--dataset click]      # fill the README performance table
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import package
+
+ROOT = package.ROOT
+VARIANTS = ["TPOT_all_models", "TPOT_xgboost", "Autosklearn"]
+STAGES = ["process_data", "train", "evaluate", "predict"]
+CLICK_DATASET = os.path.join(ROOT, "TPOT_all_models", "dataset", "data", "50k_without_encoding.csv")
+# README table rows of the variants
+README_NAMES = {"TPOT_all_models": "TPOT_all_models", "TPOT_xgboost": "TPOT_xgboost", "Autosklearn": "auto_sklearn"}
+
+# Where each variant reads its data, relative to its directory: (data directory, training, test)
+_LAYOUT = {
+    "TPOT_all_models": ("dataset", "dataset/training", "dataset/test"),
+    "TPOT_xgboost": ("data", "data/training", "data/test"),
+    "Autosklearn": ("data", "data/training", "data/test"),
+}
+
+
+def generate(spec, directory, chunk_rows=100000, seed=0):
+    """
+    Write the dataset of spec to directory/data.csv, returns the name of its target column.
+    """
+    path = os.path.join(directory, "data.csv")
+    if spec == "click":
+        shutil.copy(CLICK_DATASET, path)
+        return "click"
+
+    rows, columns = [int(value) for value in spec.split("x")]
+    rng = np.random.RandomState(seed)
+    weights = rng.normal(size=columns) * (rng.rand(columns) < 0.3)
+    names = [f"f{column}" for column in range(columns)]
+    for start in range(0, rows, chunk_rows):
+        chunk_rng = np.random.RandomState(seed + 1 + start // chunk_rows)
+        X = chunk_rng.normal(size=(min(chunk_rows, rows - start), columns))
+        # Some missing values for the imputation stage
+        X[chunk_rng.rand(*X.shape) < 0.01] = np.nan
+        logits = np.nan_to_num(X) @ weights + np.sin(np.nan_to_num(X[:, 0]) * 3)
+        frame = pd.DataFrame(X.astype(np.float32), columns=names)
+        frame["target"] = (logits + chunk_rng.logistic(size=len(X)) > 0).astype(int)
+        frame.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return "target"
+
+
+def prepare_workspace(variant, dataset_path, workspace):
+    # The package as uploaded, so that every variant runs on the same aiflib I/O path
+    package.build(variant, workspace)
+    data_directory, training_directory, test_directory = _LAYOUT[variant]
+    for directory in [data_directory, training_directory, test_directory]:
+        os.makedirs(os.path.join(workspace, directory), exist_ok=True)
+    shutil.copy(dataset_path, os.path.join(workspace, data_directory, "data.csv"))
+
+
+def environment(variant, workspace, target_column, train_minutes, seed):
+    _, training_directory, test_directory = _LAYOUT[variant]
+    return dict(os.environ, target_column=target_column, PYTHONHASHSEED=str(seed),
+                max_time_mins=str(train_minutes), random_seed=str(seed), package_directory=workspace,
+                training_data_directory=os.path.join(workspace, training_directory),
+                test_data_directory=os.path.join(workspace, test_directory),
+                artifacts_directory=os.path.join(workspace, "artifacts"))
+
+
+def run_stage(variant, stage, workspace, target_column, predict_rows):
+    """
+    Run one stage in this process (started by run_variant), returns its measurements.
+    """
+    os.chdir(workspace)
+    sys.path.insert(0, workspace)
+    data_directory, training_directory, test_directory = _LAYOUT[variant]
+    result = {}
+
+    # Import outside of the measurement, Main() is part of it
+    import main
+    import train
+
+    start, cpu_start = time.time(), _cpu_seconds()
+    if stage == "predict":
+        model = main.Main()
+        test_path = [os.path.join(test_directory, name) for name in os.listdir(test_directory) if name.endswith(".csv")][0]
+        records = pd.read_csv(test_path).drop(columns=target_column).head(predict_rows).to_json(orient="records")
+        request_start = time.time()
+        model.predict(records)
+        result["request_seconds"] = time.time() - request_start
+    else:
+        m = train.Main()
+        if stage == "process_data":
+            m.process_data(data_directory)
+        elif stage == "train":
+            m.train(training_directory)
+            m.save()
+        elif stage == "evaluate":
+            result["accuracy"] = m.evaluate(test_directory)
+            with open(os.path.join(workspace, "artifacts", "evaluation_metrics.json")) as metrics_file:
+                result["f1"] = json.load(metrics_file).get("f1")
+    result["wall_seconds"] = time.time() - start
+    result["cpu_seconds"] = _cpu_seconds() - cpu_start
+
+    usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    result["peak_rss_mb"] = usage.ru_maxrss / 1024.
+    result["peak_rss_children_mb"] = children.ru_maxrss / 1024.
+    return result
+
+
+def _cpu_seconds():
+    usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_variant(variant, dataset, dataset_path, target_column, args):
+    scratch = tempfile.mkdtemp(prefix="benchmark_")
+    workspace = os.path.join(scratch, variant)
+    prepare_workspace(variant, dataset_path, workspace)
+    env = environment(variant, workspace, target_column, args.train_minutes, args.seed)
+    results = []
+    try:
+        for stage in STAGES:
+            command = [sys.executable, os.path.abspath(__file__), "--stage", variant, stage, workspace,
+                       target_column, str(args.predict_rows)]
+            start = time.time()
+            completed = subprocess.run(command, env=env, cwd=workspace, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, universal_newlines=True)
+            record = {"dataset": dataset, "variant": variant, "stage": stage, "seed": args.seed,
+                      "train_minutes": args.train_minutes, "cpus": _cpus(), "python": platform.python_version()}
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("BENCHMARK ")]
+            if completed.returncode == 0 and lines:
+                record.update(json.loads(lines[-1][len("BENCHMARK "):]))
+                record["cpu_utilisation"] = record["cpu_seconds"] / max(record["wall_seconds"], 1e-9) / _cpus()
+            else:
+                error = completed.stderr.strip().splitlines()
+                record.update(wall_seconds=time.time() - start, error=error[-1] if error else f"exit code {completed.returncode}")
+            results.append(record)
+            print(json.dumps(record))
+            if "error" in record:
+                # The later stages depend on this one
+                break
+    finally:
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def _cpus():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+
+def fill_readme(results_path, dataset):
+    with open(results_path) as results_file:
+        records = [json.loads(line) for line in results_file if line.strip()]
+    latest = {}
+    for record in records:
+        if record["dataset"] == dataset and "error" not in record:
+            latest[(record["variant"], record["stage"])] = record
+
+    readme_path = os.path.join(ROOT, "README.md")
+    with open(readme_path) as readme_file:
+        readme = readme_file.read()
+    for variant, name in README_NAMES.items():
+        evaluate, train = latest.get((variant, "evaluate")), latest.get((variant, "train"))
+        if evaluate is None or train is None:
+            continue
+        f1 = f"{evaluate['f1']:.4f}" if evaluate.get("f1") is not None else ""
+        row = f"| {name:<15} | {evaluate['accuracy']:<8.4f} | {f1:<8} | {train['wall_seconds'] / 60.:<14.1f} |"
+        readme = re.sub(rf"^\| {re.escape(name)} +\|.*$", row, readme, flags=re.MULTILINE)
+    with open(readme_path, "w") as readme_file:
+        readme_file.write(readme)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--stage":
+        variant, stage, workspace, target_column, predict_rows = sys.argv[2:7]
+        result = run_stage(variant, stage, workspace, target_column, int(predict_rows))
+        print("BENCHMARK " + json.dumps(result))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", default=["10000x10", "100000x50"])
+    parser.add_argument("--variants", nargs="+", default=VARIANTS, choices=VARIANTS)
+    parser.add_argument("--train-minutes", type=int, default=2)
+    parser.add_argument("--predict-rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=os.path.join(ROOT, "benchmarks", "results.jsonl"))
+    parser.add_argument("--keep", action="store_true", help="keep the workspaces")
+    parser.add_argument("--readme", action="store_true", help="fill the README performance table from --results")
+    parser.add_argument("--dataset", default="click", help="dataset of the README table")
+    args = parser.parse_args()
+
+    if args.readme:
+        fill_readme(args.results, args.dataset)
+        return
+
+    for dataset in args.datasets:
+        data_directory = tempfile.mkdtemp(prefix="benchmark_data_")
+        try:
+            target_column = generate(dataset, data_directory, seed=args.seed)
+            for variant in args.variants:
+                results = run_variant(variant, dataset, os.path.join(data_directory, "data.csv"), target_column, args)
+                with open(args.results, "a") as results_file:
+                    for record in results:
+                        results_file.write(json.dumps(record) + "\n")
+        finally:
+            shutil.rmtree(data_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
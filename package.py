@@ -0,0 +1,51 @@
+"""
+Build the ML packages uploaded to AI Fabric.
+
+The variants share the aiflib core of TPOT_all_models: a package is the variant directory
+(main.py, train.py, requirements and its own modules) with aiflib copied in and empty
+model and artifacts directories, without data, trained models or archives.
+
+Usage: python package.py [TPOT_all_models TPOT_xgboost Autosklearn] [--output dist]
+"""
+import argparse
+import os
+import shutil
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+VARIANTS = ["TPOT_all_models", "TPOT_xgboost", "Autosklearn"]
+CORE = os.path.join(ROOT, "TPOT_all_models", "aiflib")
+
+_IGNORE = shutil.ignore_patterns(
+    "aiflib", "data", "dataset", "artifacts", "model", "AIFabric_Package", "*.zip", "*.sav", "__pycache__", "*.pyc")
+
+
+def build(variant, directory):
+    """
+    Assemble the package of variant in directory, which must not exist yet.
+    """
+    shutil.copytree(os.path.join(ROOT, variant), directory, ignore=_IGNORE)
+    shutil.copytree(CORE, os.path.join(directory, "aiflib"), ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    for name in ["model", "artifacts"]:
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("variants", nargs="*", help=f"any of {VARIANTS}, all of them by default")
+    parser.add_argument("--output", default=os.path.join(ROOT, "dist"))
+    args = parser.parse_args()
+    unknown = set(args.variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants {sorted(unknown)}, choose from {VARIANTS}")
+
+    for variant in args.variants or VARIANTS:
+        directory = os.path.join(args.output, variant)
+        shutil.rmtree(directory, ignore_errors=True)
+        build(variant, directory)
+        archive = shutil.make_archive(directory, "zip", directory)
+        print(f"{variant}: {archive}")
+
+
+if __name__ == "__main__":
+    main()